@@ -0,0 +1,49 @@
+# Load test for the clicking game.
+#
+#   python benchmarks/clicker_load.py --url http://localhost:8000 --label after -o after.json
+#
+# Run it once against the old image and once against the new one with the
+# same --concurrency/--duration to get a before/after requests/sec comparison.
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from common import emit, run_load
+
+MODES = ["10sec", "30sec", "60sec"]
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+
+        async def page_view(worker_id, i):
+            response = await client.get("/")
+            response.raise_for_status()
+
+        async def score_burst(worker_id, i):
+            response = await client.post("/api/scores", json={
+                "username": f"bench-{worker_id}",
+                "score": random.randint(0, 500),
+                "mode": random.choice(MODES),
+            })
+            response.raise_for_status()
+
+        reports = []
+        for name, request in (("page_view", page_view), ("score_burst", score_burst)):
+            report = await run_load(name, request, concurrency=args.concurrency, duration=args.duration)
+            report["label"] = args.label
+            reports.append(report)
+        emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clicker requests/sec and latency")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
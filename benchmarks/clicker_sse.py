@@ -0,0 +1,103 @@
+# Live leaderboard fan-out benchmark for the clicking game.
+#
+#   python benchmarks/clicker_sse.py --url http://localhost:8000 --subscribers 100,500,1000
+#
+# For each subscriber count it opens that many /api/stream connections to a
+# single worker, saves --rounds scores one at a time and measures how long each
+# connected subscriber takes to receive the resulting leaderboard event.
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import emit, percentile
+
+
+class Subscriber:
+    def __init__(self):
+        self.events = 0
+        self.received = []
+        self.changed = asyncio.Event()
+
+    async def run(self, client, connected):
+        async with client.stream("GET", "/api/stream") as response:
+            response.raise_for_status()
+            connected.set()
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line.split(":", 1)[1].strip()
+                elif line == "" and event == "leaderboard":
+                    self.events += 1
+                    self.received.append(time.perf_counter())
+                    self.changed.set()
+                    event = None
+
+
+async def wait_for_events(subscriber, count, timeout):
+    deadline = time.perf_counter() + timeout
+    while subscriber.events < count:
+        subscriber.changed.clear()
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        try:
+            await asyncio.wait_for(subscriber.changed.wait(), remaining)
+        except asyncio.TimeoutError:
+            return False
+    return True
+
+
+async def run(url, count, rounds, timeout):
+    limits = httpx.Limits(max_connections=count + 10)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=httpx.Timeout(30, read=None)) as client:
+        subscribers = [Subscriber() for _ in range(count)]
+        ready = [asyncio.Event() for _ in range(count)]
+        tasks = [asyncio.create_task(s.run(client, r)) for s, r in zip(subscribers, ready)]
+        await asyncio.wait([asyncio.create_task(r.wait()) for r in ready], timeout=timeout)
+        connected = [s for s, r in zip(subscribers, ready) if r.is_set()]
+
+        latencies = []
+        missed = 0
+        for n in range(1, rounds + 1):
+            sent = time.perf_counter()
+            response = await client.post("/api/scores", json={
+                "username": f"sse-bench-{count}-{n}", "score": 1_000_000 + n, "mode": "10sec",
+            })
+            response.raise_for_status()
+            results = await asyncio.gather(*(wait_for_events(s, n, timeout) for s in connected))
+            missed += results.count(False)
+            latencies.extend(s.received[n - 1] - sent for s in connected if len(s.received) >= n)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "name": "leaderboard_fanout",
+        "subscribers": count,
+        "connected": len(connected),
+        "rounds": rounds,
+        "missed_deliveries": missed,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def main(args):
+    reports = []
+    for count in (int(c) for c in args.subscribers.split(",")):
+        reports.append(await run(args.url, count, args.rounds, args.timeout))
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent live-stream subscribers per clicker worker")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--subscribers", default="100,500,1000")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import time
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, errors, elapsed, **extra):
+    # latencies are in seconds, the report is in milliseconds
+    report = {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+    report.update(extra)
+    return report
+
+
+async def run_load(name, request, concurrency=50, duration=10.0, requests=None):
+    """Call ``request(worker_id, i)`` from ``concurrency`` workers until
+    ``duration`` seconds pass (or ``requests`` calls in total) and report
+    throughput and latency percentiles."""
+    latencies = []
+    errors = 0
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id):
+        nonlocal errors, issued
+        i = 0
+        while time.perf_counter() < deadline:
+            if requests is not None:
+                if issued >= requests:
+                    return
+                issued += 1
+            started = time.perf_counter()
+            try:
+                await request(worker_id, i)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - started, concurrency=concurrency)
+
+
+def emit(reports, output=None):
+    text = json.dumps(reports, indent=2)
+    if output:
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
@@ -0,0 +1,89 @@
+# Gateway -> students hop benchmark against a local stub of the students service.
+#
+#   python benchmarks/gateway_proxy.py
+#   python benchmarks/gateway_proxy.py --gateway-url http://localhost:8001   # also drive a running gateway
+#
+# Compares opening a new httpx.AsyncClient per request (the old gateway
+# behaviour) with one shared, pooled keep-alive client, both calling the stub.
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import emit, run_load
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REGISTER_PATH = "/api/students/v1_0/register_student"
+PAYLOAD = {"name": "Bench", "email": "bench@example.com", "password": "secret", "department": "CSE"}
+
+
+def start_stub(port):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "stub_students:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/students/1")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("stub students service did not start")
+
+
+async def main(args):
+    stub = start_stub(args.stub_port)
+    upstream = f"http://127.0.0.1:{args.stub_port}"
+    reports = []
+    try:
+        async def client_per_request(worker_id, i):
+            async with httpx.AsyncClient() as client:
+                response = await client.post(f"{upstream}{REGISTER_PATH}", json=PAYLOAD)
+                response.raise_for_status()
+
+        reports.append(await run_load("client_per_request", client_per_request,
+                                      concurrency=args.concurrency, duration=args.duration))
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits) as shared:
+            async def pooled_client(worker_id, i):
+                response = await shared.post(f"{upstream}{REGISTER_PATH}", json=PAYLOAD)
+                response.raise_for_status()
+
+            reports.append(await run_load("pooled_client", pooled_client,
+                                          concurrency=args.concurrency, duration=args.duration))
+
+            if args.gateway_url:
+                async def through_gateway(worker_id, i):
+                    response = await shared.post(f"{args.gateway_url}/api/v1_0/register_student", json=PAYLOAD)
+                    response.raise_for_status()
+
+                async def gateway_listing(worker_id, i):
+                    response = await shared.get(f"{args.gateway_url}/api/students/")
+                    response.raise_for_status()
+
+                reports.append(await run_load("gateway_register", through_gateway,
+                                              concurrency=args.concurrency, duration=args.duration))
+                # Large payload (STUB_LISTING_SIZE students) streamed through the gateway
+                reports.append(await run_load("gateway_listing", gateway_listing,
+                                              concurrency=args.concurrency, duration=args.duration))
+    finally:
+        stub.terminate()
+        stub.wait()
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gateway upstream client benchmark")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--gateway-url", help="running gateway whose STUDENTS_SERVICE_URL points at the stub")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,132 @@
+# Serialization micro-benchmark: encode/decode time and payload size of the
+# payloads that cross process boundaries, per format.
+#
+#   python benchmarks/serialization.py
+#
+# Payloads: student listing pages (as the students service returns them and
+# the gateway passes them on) and clicker leaderboards (as pushed to browsers).
+# Formats: the standard json module, orjson and msgpack, plus for listings the
+# full response_model path: Pydantic's dump_json, as JSON callers get it, and
+# the same re-encoded as MessagePack, as callers that ask for it get it.
+import argparse
+import json
+import random
+import sys
+import time
+
+from common import emit
+from stub_students import student
+
+MODES = ["10sec", "30sec", "60sec"]
+
+
+def listing(rows):
+    return [student(n) for n in range(1, rows + 1)]
+
+
+def leaderboards(top_n):
+    rng = random.Random(1)
+    return {mode: [{"username": f"player{rng.randint(1, 99999)}", "score": rng.randint(0, 500)}
+                   for _ in range(top_n)] for mode in MODES}
+
+
+def formats():
+    found = {"json": (lambda value: json.dumps(value).encode(), json.loads)}
+    try:
+        import orjson
+        found["orjson"] = (orjson.dumps, orjson.loads)
+    except ImportError:
+        print("orjson not installed, skipping", file=sys.stderr)
+    try:
+        import msgpack
+        found["msgpack"] = (msgpack.packb, msgpack.unpackb)
+    except ImportError:
+        print("msgpack not installed, skipping", file=sys.stderr)
+    return found
+
+
+def pydantic_listing_formats():
+    # A response_model=List[StudentResponse] route validates the rows first
+    # and FastAPI dumps JSON straight from Pydantic. For callers that ask for
+    # MessagePack the students service then decodes that JSON with orjson and
+    # packs it again (MessagePackMiddleware).
+    try:
+        from typing import List, Optional
+
+        from pydantic import BaseModel, TypeAdapter
+    except ImportError:
+        print("pydantic v2 not installed, skipping", file=sys.stderr)
+        return {}
+
+    class Student(BaseModel):
+        id: int
+        name: str
+        email: str
+        department: str
+        registration_no: Optional[str] = None
+        registration_status: str
+        phone: Optional[str] = None
+
+    adapter = TypeAdapter(List[Student])
+    found = {"fastapi_dump_json": (lambda value: adapter.dump_json(adapter.validate_python(value)),
+                                   adapter.validate_json)}
+    try:
+        import msgpack
+        import orjson
+        found["fastapi_msgpack"] = (
+            lambda value: msgpack.packb(orjson.loads(adapter.dump_json(adapter.validate_python(value)))),
+            lambda data: adapter.validate_python(msgpack.unpackb(data)))
+    except ImportError:
+        pass
+    return found
+
+
+def per_op_us(fn, arg, min_time):
+    # Repeats until min_time has passed so small payloads get enough runs
+    runs, elapsed = 0, 0.0
+    started = time.perf_counter()
+    while elapsed < min_time:
+        for _ in range(10):
+            fn(arg)
+        runs += 10
+        elapsed = time.perf_counter() - started
+    return elapsed / runs * 1e6
+
+
+def measure(payload_name, payload, name, encode, decode, min_time, baseline):
+    encoded = encode(payload)
+    report = {
+        "name": f"{payload_name}:{name}",
+        "bytes": len(encoded),
+        "encode_us": round(per_op_us(encode, payload, min_time), 1),
+        "decode_us": round(per_op_us(decode, encoded, min_time), 1),
+    }
+    if baseline is not None:
+        report["size_vs_json"] = round(report["bytes"] / baseline["bytes"], 3)
+        report["encode_speedup"] = round(baseline["encode_us"] / report["encode_us"], 2)
+        report["decode_speedup"] = round(baseline["decode_us"] / report["decode_us"], 2)
+    return report
+
+
+def main(args):
+    payloads = [(f"listing_{rows}", listing(rows), True) for rows in map(int, args.rows.split(","))]
+    payloads.append((f"leaderboards_top{args.top_n}", leaderboards(args.top_n), False))
+    plain, full_path = formats(), pydantic_listing_formats()
+    reports = []
+    for payload_name, payload, is_listing in payloads:
+        candidates = {**plain, **full_path} if is_listing else plain
+        baseline = None
+        for name, (encode, decode) in candidates.items():
+            report = measure(payload_name, payload, name, encode, decode, args.min_time, baseline)
+            baseline = baseline or report
+            reports.append(report)
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode/decode cost and size per serialization format")
+    parser.add_argument("--rows", default="100,1000", help="student listing page sizes")
+    parser.add_argument("--top-n", type=int, default=10, help="leaderboard entries per mode")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent on each measurement")
+    parser.add_argument("-o", "--output")
+    main(parser.parse_args())
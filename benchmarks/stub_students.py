@@ -0,0 +1,56 @@
+# Minimal stand-in for the students service, used by the gateway benchmarks.
+# It answers instantly so the numbers reflect the gateway hop, not MySQL.
+#
+#   uvicorn stub_students:app --port 8100
+import asyncio
+import json
+import os
+import random
+
+LISTING_SIZE = int(os.getenv("STUB_LISTING_SIZE", "1000"))
+DELAY = float(os.getenv("STUB_DELAY", "0"))  # seconds added to every response
+# Fault injection for exercising the gateway's breaker, retries and hedging
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))  # share of requests answered with 503
+SLOW_RATE = float(os.getenv("STUB_SLOW_RATE", "0"))  # share of requests delayed by STUB_SLOW_DELAY
+SLOW_DELAY = float(os.getenv("STUB_SLOW_DELAY", "1.0"))
+
+
+def student(n):
+    return {
+        "id": n,
+        "name": f"Student {n}",
+        "email": f"student{n}@example.com",
+        "department": "CSE",
+        "registration_no": f"REG{n:06d}",
+        "registration_status": "pending",
+        "phone": None,
+    }
+
+
+LISTING = json.dumps([student(n) for n in range(1, LISTING_SIZE + 1)]).encode()
+REGISTERED = json.dumps({"status": "success", "data": student(1)}).encode()
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    if DELAY:
+        await asyncio.sleep(DELAY)
+    if SLOW_RATE and random.random() < SLOW_RATE:
+        await asyncio.sleep(SLOW_DELAY)
+    path = scope["path"]
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        status, body = 503, b'{"detail":"injected failure"}'
+    elif scope["method"] == "POST" and path.endswith("/register_student"):
+        status, body = 201, REGISTERED
+    elif path.rstrip("/") == "/api/students":
+        status, body = 200, LISTING
+    elif path.startswith("/api/students/") and path.rsplit("/", 1)[-1].isdigit():
+        status, body = 200, json.dumps(student(int(path.rsplit("/", 1)[-1]))).encode()
+    else:
+        status, body = 404, b'{"detail":"Not Found"}'
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
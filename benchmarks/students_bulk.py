@@ -0,0 +1,92 @@
+# Bulk registration benchmark: one Student.create per row vs batched bulk_create.
+#
+#   python benchmarks/students_bulk.py --rows 20000 --batch-sizes 100,500,2000
+#
+# Runs in-process against a throwaway SQLite database (or --db-url) and reports
+# rows inserted per second for each strategy. Every row reuses one precomputed
+# password hash, so the numbers compare inserts rather than scrypt
+# (students_hashing.py measures that); pass --hash-passwords to include it.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The service imports its own modules top-level and the shared package from the repo root
+sys.path[:0] = [os.path.join(HERE, "..", "student_management_system", "students"), os.path.join(HERE, "..")]
+
+from tortoise import Tortoise  # noqa: E402
+
+from db.models.students import Student  # noqa: E402
+from routers.students import StudentCreate, build_student, build_student_in_bulk  # noqa: E402
+from services.passwords import hash_password_sync, hasher  # noqa: E402
+from services.bulk_registration import register_in_batches  # noqa: E402
+
+from common import emit  # noqa: E402
+
+
+def payloads(total, prefix):
+    return [
+        {"name": f"Student {n}", "email": f"{prefix}{n}@example.com", "password": "secret",
+         "department": "CSE", "registration_no": f"{prefix[:4].upper()}{n:08d}"}
+        for n in range(total)
+    ]
+
+
+async def rows(items):
+    for number, item in enumerate(items, start=1):
+        yield number, item
+
+
+def report(name, total, elapsed, **extra):
+    return {"name": name, "rows": total, "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(total / elapsed, 1), **extra}
+
+
+def skip_hashing():
+    password_hash = hash_password_sync("secret")
+
+    async def prehashed(password, wait=False):
+        return password_hash
+
+    hasher.hash = prehashed
+
+
+async def main(args):
+    if not args.hash_passwords:
+        skip_hashing()
+    db_url = args.db_url or f"sqlite://{os.path.join(tempfile.mkdtemp(), 'bulk.sqlite3')}"
+    await Tortoise.init(db_url=db_url, modules={"models": ["db.models.students"]})
+    await Tortoise.generate_schemas()
+    reports = []
+    try:
+        await Student.all().delete()
+        started = time.perf_counter()
+        for item in payloads(args.rows, "single"):
+            student = await build_student(StudentCreate(**item))
+            await student.save()
+        reports.append(report("per_row_create", args.rows, time.perf_counter() - started))
+
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            await Student.all().delete()
+            started = time.perf_counter()
+            result = await register_in_batches(rows(payloads(args.rows, f"bulk{batch_size}-")),
+                                               StudentCreate, build_student_in_bulk, batch_size,
+                                               build_concurrency=hasher.workers)
+            reports.append(report("bulk_create", args.rows, time.perf_counter() - started,
+                                  batch_size=batch_size, created=result.created))
+    finally:
+        await Tortoise.close_connections()
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk registration throughput")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    parser.add_argument("--db-url", help="Tortoise DB URL (default: temp SQLite)")
+    parser.add_argument("--hash-passwords", action="store_true", help="hash every row's password with scrypt")
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
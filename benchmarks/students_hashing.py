@@ -0,0 +1,110 @@
+# Password hashing vs event loop benchmark.
+#
+#   python benchmarks/students_hashing.py --hash-concurrency 32 --duration 10
+#
+# Serves a tiny app (this module) with uvicorn and measures the latency of an
+# unrelated endpoint (/ping) while other clients keep hashing passwords, once
+# with scrypt run inline in the handler and once through the students
+# service's bounded PasswordHasher pool.
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The service imports its own modules top-level and the shared package from the repo root
+sys.path[:0] = [os.path.join(HERE, "..", "student_management_system", "students"), os.path.join(HERE, "..")]
+
+from services.passwords import HashingBusy, hash_password_sync, hasher  # noqa: E402
+
+from common import emit, run_load  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Without this the pool's worker processes outlive the server
+    hasher.start()
+    try:
+        yield
+    finally:
+        hasher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+@app.post("/hash/inline")
+async def hash_inline():
+    # What hashing directly inside an async handler would do
+    return {"hash": hash_password_sync("correct horse battery staple")}
+
+
+@app.post("/hash/pool")
+async def hash_pool():
+    try:
+        return {"hash": await hasher.hash("correct horse battery staple")}
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="busy")
+
+
+def start_server(port):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "students_hashing:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/ping")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("benchmark server did not start")
+
+
+async def main(args):
+    server = start_server(args.port)
+    reports = []
+    try:
+        limits = httpx.Limits(max_connections=args.hash_concurrency + args.ping_concurrency + 10)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            for mode in ("inline", "pool"):
+                async def hash_request(worker_id, i):
+                    response = await client.post(f"/hash/{mode}")
+                    if response.status_code != 503:
+                        response.raise_for_status()
+
+                async def ping(worker_id, i):
+                    (await client.get("/ping")).raise_for_status()
+
+                hashing, pinging = await asyncio.gather(
+                    run_load(f"hash_{mode}", hash_request, args.hash_concurrency, args.duration),
+                    run_load(f"ping_during_hash_{mode}", ping, args.ping_concurrency, args.duration),
+                )
+                reports += [hashing, pinging]
+    finally:
+        server.terminate()
+        server.wait()
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="p99 of unrelated endpoints while hashing passwords")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--hash-concurrency", type=int, default=32)
+    parser.add_argument("--ping-concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
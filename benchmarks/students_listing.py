@@ -0,0 +1,114 @@
+# Student listing benchmark: unbounded Student.all() vs keyset pages vs the NDJSON stream.
+#
+#   python benchmarks/students_listing.py --rows 100000,1000000
+#
+# Seeds a throwaway SQLite database (pass --db-url for MySQL) and times the
+# listing code paths in-process, so the numbers reflect the ORM and
+# serialization work rather than HTTP.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The service imports its own modules top-level and the shared package from the repo root
+sys.path[:0] = [os.path.join(HERE, "..", "student_management_system", "students"), os.path.join(HERE, "..")]
+
+from tortoise import Tortoise  # noqa: E402
+
+from db.models.students import Student  # noqa: E402
+from routers.students import LISTING_FIELDS, StudentResponse  # noqa: E402
+from shared.serialization import dumps_json  # noqa: E402
+
+from common import emit  # noqa: E402
+
+SEED_BATCH = 5000
+
+
+async def seed(total):
+    await Student.all().delete()
+    departments = ["CSE", "ECE", "ME", "CE", "EEE"]
+    for start in range(0, total, SEED_BATCH):
+        await Student.bulk_create([
+            Student(
+                name=f"Student {n}", email=f"student{n}@example.com", password_hash="x",
+                department=departments[n % len(departments)], registration_no=f"REG{n:08d}",
+            )
+            for n in range(start, min(total, start + SEED_BATCH))
+        ])
+
+
+async def measure(name, rows, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = await fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"name": name, "rows": rows, "returned": count,
+            "elapsed_ms": round(elapsed * 1000, 1), "peak_mem_mb": round(peak / 2 ** 20, 1)}
+
+
+def response_json(student):
+    # response_model serialization under Pydantic v2, or v1's from_orm
+    if hasattr(StudentResponse, "model_validate"):
+        return StudentResponse.model_validate(student, from_attributes=True).model_dump_json()
+    return StudentResponse.from_orm(student).json()
+
+
+async def unbounded_all():
+    # What GET /api/students/ used to do
+    students = await Student.all()
+    return len([response_json(s) for s in students])
+
+
+async def keyset_page(limit=100, after_id=None):
+    query = Student.all()
+    if after_id is not None:
+        query = query.filter(id__gt=after_id)
+    rows = await query.order_by("id").limit(limit + 1).values(*LISTING_FIELDS)
+    return len(rows[:limit])
+
+
+async def ndjson_stream(chunk_size=1000):
+    # The body of GET /api/students/stream
+    count, last_id = 0, 0
+    while True:
+        chunk = await Student.filter(id__gt=last_id).order_by("id").limit(chunk_size).values(*LISTING_FIELDS)
+        if not chunk:
+            return count
+        b"".join(dumps_json(row) + b"\n" for row in chunk)
+        count += len(chunk)
+        if len(chunk) < chunk_size:
+            return count
+        last_id = chunk[-1]["id"]
+
+
+async def main(args):
+    db_url = args.db_url or f"sqlite://{os.path.join(tempfile.mkdtemp(), 'listing.sqlite3')}"
+    await Tortoise.init(db_url=db_url, modules={"models": ["db.models.students"]})
+    await Tortoise.generate_schemas()
+    reports = []
+    try:
+        for rows in (int(r) for r in args.rows.split(",")):
+            await seed(rows)
+            reports.append(await measure("keyset_first_page", rows, keyset_page))
+            reports.append(await measure("keyset_deep_page", rows, lambda: keyset_page(after_id=rows - 200)))
+            reports.append(await measure("ndjson_stream", rows, ndjson_stream))
+            if not args.skip_unbounded:
+                reports.append(await measure("unbounded_all", rows, unbounded_all))
+    finally:
+        await Tortoise.close_connections()
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Students listing benchmark")
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--db-url", help="Tortoise DB URL, e.g. mysql://root:pw@127.0.0.1:3307/bench (default: temp SQLite)")
+    parser.add_argument("--skip-unbounded", action="store_true", help="skip the old Student.all() path")
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+# Student search benchmark: query latency of /api/students/search vs table size.
+#
+#   python benchmarks/students_search.py --rows 10000,100000 --db-url mysql://root:pw@127.0.0.1:3307/bench
+#
+# Seeds students (and one document per student) and times search_students()
+# in-process for a handful of query shapes. Against MySQL this measures the
+# FULLTEXT indexes; on the default temporary SQLite database it measures the
+# LIKE fallback, which scans and is expected to grow linearly with rows.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The service imports its own modules top-level and the shared package from the repo root
+sys.path[:0] = [os.path.join(HERE, "..", "student_management_system", "students"), os.path.join(HERE, "..")]
+
+from tortoise import Tortoise  # noqa: E402
+
+from db.models.documents import Document  # noqa: E402
+from db.models.students import Student  # noqa: E402
+from routers.students import LISTING_FIELDS  # noqa: E402
+from services.search import ensure_search_indexes, search_students  # noqa: E402
+
+from common import emit, summarize  # noqa: E402
+
+SEED_BATCH = 5000
+FIRST_NAMES = ["Asha", "Ravi", "Meera", "Arjun", "Priya", "Karan", "Divya", "Nikhil", "Sneha", "Vikram"]
+LAST_NAMES = ["Sharma", "Iyer", "Patel", "Reddy", "Gupta", "Nair", "Singh", "Das", "Mehta", "Rao"]
+DEPARTMENTS = ["CSE", "ECE", "MECH", "CIVIL", "EEE"]
+DOC_TITLES = ["marksheet", "transcript", "aadhaar card", "fee receipt", "transfer certificate"]
+
+
+def queries(rows):
+    return {
+        "single_word": "Meera",
+        "two_words": "Arjun Reddy",
+        "registration_no": f"REG{rows // 2:08d}",
+        "document_title": "transcript",
+        "no_match": "zzzzqqq",
+    }
+
+
+async def seed(total):
+    await Document.all().delete()
+    await Student.all().delete()
+    for start in range(0, total, SEED_BATCH):
+        numbers = range(start, min(total, start + SEED_BATCH))
+        await Student.bulk_create([
+            Student(
+                name=f"{FIRST_NAMES[n % 10]} {LAST_NAMES[n // 10 % 10]}", email=f"student{n}@example.com",
+                password_hash="x", department=DEPARTMENTS[n % len(DEPARTMENTS)], registration_no=f"REG{n:08d}",
+            )
+            for n in numbers
+        ])
+    ids = await Student.all().order_by("id").values_list("id", flat=True)
+    for start in range(0, len(ids), SEED_BATCH):
+        await Document.bulk_create([
+            Document(student_id=student_id, title=f"{DOC_TITLES[student_id % len(DOC_TITLES)]} {student_id}",
+                     file_path=f"/uploads/{student_id}.pdf", sha256=f"{student_id:064x}", size=1024,
+                     content_type="application/pdf")
+            for student_id in ids[start:start + SEED_BATCH]
+        ])
+
+
+async def measure(name, rows, q, repeat, limit):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        query_started = time.perf_counter()
+        results, _ = await search_students(q, LISTING_FIELDS, limit)
+        latencies.append(time.perf_counter() - query_started)
+    return summarize(name, latencies, 0, time.perf_counter() - started, rows=rows, query=q, hits=len(results))
+
+
+async def main(args):
+    db_url = args.db_url or f"sqlite://{os.path.join(tempfile.mkdtemp(), 'search.sqlite3')}"
+    await Tortoise.init(db_url=db_url, modules={"models": ["db.models.students", "db.models.documents"]})
+    await Tortoise.generate_schemas()
+    await ensure_search_indexes()
+    reports = []
+    try:
+        for rows in (int(r) for r in args.rows.split(",")):
+            await seed(rows)
+            for name, q in queries(rows).items():
+                reports.append(await measure(name, rows, q, args.repeat, args.limit))
+    finally:
+        await Tortoise.close_connections()
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Students search benchmark")
+    parser.add_argument("--rows", default="10000,100000")
+    parser.add_argument("--db-url", help="Tortoise DB URL, e.g. mysql://root:pw@127.0.0.1:3307/bench (default: temp SQLite)")
+    parser.add_argument("--repeat", type=int, default=50, help="searches per query shape")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,165 @@
+# Document upload benchmark: buffered vs spooled vs streamed multipart uploads.
+#
+#   python benchmarks/students_upload.py --size-mb 50 --concurrency 8 --uploads 32
+#
+# Serves a tiny app (this module) with uvicorn, once per strategy so each gets
+# a fresh process, and sends concurrent uploads of --size-mb files. Reports
+# latency, throughput and the server's peak resident memory (Linux only).
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The service imports its own modules top-level and the shared package from the repo root
+sys.path[:0] = [os.path.join(HERE, "..", "student_management_system", "students"), os.path.join(HERE, "..")]
+
+from services.document_storage import UPLOAD_DIR, UploadError, receive_upload  # noqa: E402
+
+from common import emit, summarize  # noqa: E402
+
+BOUNDARY = "students-upload-benchmark"
+BLOCK = os.urandom(2 ** 20)
+MAX_SIZE = 2 ** 40  # the benchmark measures transfer, not limits
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+@app.post("/upload/buffered")
+async def upload_buffered(request: Request):
+    # Whole body in memory, then parsed and written in one go
+    body = await request.body()
+    start = body.index(b"\r\n\r\n") + 4
+    end = body.rindex(f"\r\n--{BOUNDARY}".encode())
+    path = os.path.join(UPLOAD_DIR, os.urandom(8).hex())
+    with open(path, "wb") as fh:
+        fh.write(body[start:end])
+    return {"size": end - start}
+
+
+@app.post("/upload/form")
+async def upload_form(request: Request):
+    # Starlette's UploadFile: spooled to a temporary file, then copied
+    form = await request.form()
+    upload = form["file"]
+    path = os.path.join(UPLOAD_DIR, os.urandom(8).hex())
+    with open(path, "wb") as fh:
+        await asyncio.to_thread(shutil.copyfileobj, upload.file, fh, 2 ** 20)
+    return {"size": upload.size}
+
+
+@app.post("/upload/streaming")
+async def upload_streaming(request: Request):
+    # The students service's path: parsed as it arrives, written in chunks
+    try:
+        _, stored = await receive_upload(request, max_size=MAX_SIZE)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return {"size": stored.size}
+
+
+def multipart_body(size, tag):
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"bench.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n%PDF-1.4 {tag}\n").encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    blocks = size // len(BLOCK)
+
+    async def chunks():
+        yield head
+        for _ in range(blocks):
+            yield BLOCK
+        yield tail
+
+    return chunks(), len(head) + blocks * len(BLOCK) + len(tail)
+
+
+def start_server(port, upload_dir):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "students_upload:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env={**os.environ, "UPLOAD_DIR": upload_dir},
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/ping")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("benchmark server did not start")
+
+
+def peak_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+
+
+async def run_strategy(name, args):
+    upload_dir = tempfile.mkdtemp()
+    server = start_server(args.port, upload_dir)
+    latencies, errors, issued = [], 0, 0
+    size = args.size_mb * 2 ** 20
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=300) as client:
+            async def worker():
+                nonlocal errors, issued
+                while issued < args.uploads:
+                    issued += 1
+                    body, length = multipart_body(size, issued)
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(f"/upload/{name}", content=body, headers={
+                            "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+                            "Content-Length": str(length),
+                        })
+                        response.raise_for_status()
+                    except Exception:
+                        errors += 1
+                    else:
+                        latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+        return summarize(name, latencies, errors, elapsed, concurrency=args.concurrency, size_mb=args.size_mb,
+                         throughput_mb_s=round(len(latencies) * args.size_mb / elapsed, 1),
+                         server_peak_rss_mb=peak_rss_mb(server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+async def main(args):
+    reports = []
+    for name in args.strategies.split(","):
+        reports.append(await run_strategy(name, args))
+    emit(reports, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent large document uploads")
+    parser.add_argument("--port", type=int, default=8103)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--strategies", default="buffered,form,streaming")
+    parser.add_argument("-o", "--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,245 @@
+# Offline benchmark suite for the clicker, the gateway and the students service.
+#
+#   python benchmarks/suite.py -o baseline.json
+#   python benchmarks/suite.py --baseline baseline.json     # exits 1 on a regression
+#
+# Every app runs in-process behind httpx.ASGITransport against local stand-ins:
+# fakeredis for Redis, a throwaway SQLite database for MySQL and stub_students.py
+# behind the gateway, so the suite needs no Docker and no network. Each app gets
+# its own subprocess because the gateway and the students service both have a
+# main.py.
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+from common import emit, run_load
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+APP_DIRS = {
+    "clicker": os.path.join(ROOT, "clicking-game"),
+    "gateway": os.path.join(ROOT, "student_management_system", "gateway"),
+    "students": os.path.join(ROOT, "student_management_system", "students"),
+}
+MODES = ["10sec", "30sec", "60sec"]
+DEPARTMENTS = ["CSE", "ECE", "ME", "CE", "EEE"]
+# Registration emails must stay unique across the warm-up and measured runs
+emails = (f"bench{n}@example.com" for n in itertools.count())
+# Compared against the baseline; throughput must not drop, latency must not rise
+HIGHER_IS_BETTER = ("rps",)
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def in_process_client(app, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                             limits=limits, timeout=30)
+
+
+async def measure(name, request, args):
+    # A short unreported run first, so connection setup, caches and lazy
+    # imports don't land in the percentiles
+    if args.warmup:
+        await run_load(name, request, args.concurrency, args.warmup)
+    return await run_load(name, request, args.concurrency, args.duration)
+
+
+async def clicker_workloads(args, rng):
+    import fakeredis
+
+    import app as clicker
+
+    clicker.make_redis_client = lambda: fakeredis.FakeAsyncRedis()
+    async with clicker.app.router.lifespan_context(clicker.app):
+        async with in_process_client(clicker.app, args.concurrency) as client:
+
+            async def page_view(worker_id, i):
+                response = await client.get("/")
+                response.raise_for_status()
+
+            async def score_burst(worker_id, i):
+                response = await client.post("/api/scores", json={
+                    "username": f"bench-{worker_id}",
+                    "score": rng.randint(0, 500),
+                    "mode": rng.choice(MODES),
+                })
+                response.raise_for_status()
+
+            return [
+                await measure("clicker_page_view", page_view, args),
+                await measure("clicker_score_burst", score_burst, args),
+            ]
+
+
+async def gateway_workloads(args, rng):
+    sys.path.insert(0, HERE)
+    import stub_students
+
+    import main as gateway
+
+    async with gateway.app.router.lifespan_context(gateway.app):
+        # Swap the real upstream client for one that calls the stub in-process
+        async with in_process_client(stub_students.app, args.concurrency) as upstream:
+            gateway.students.bind(upstream)
+            async with in_process_client(gateway.app, args.concurrency) as client:
+
+                async def register(worker_id, i):
+                    response = await client.post("/api/v1_0/register_student", json={
+                        "name": "Bench", "email": next(emails),
+                        "password": "secret", "department": rng.choice(DEPARTMENTS),
+                    })
+                    response.raise_for_status()
+
+                async def listing(worker_id, i):
+                    response = await client.get("/api/students/")
+                    response.raise_for_status()
+
+                async def lookup(worker_id, i):
+                    response = await client.get(f"/api/students/{rng.randint(1, 1000)}")
+                    response.raise_for_status()
+
+                return [
+                    await measure("gateway_register", register, args),
+                    await measure("gateway_listing", listing, args),
+                    await measure("gateway_lookup", lookup, args),
+                ]
+
+
+async def students_workloads(args, rng):
+    from db.models.students import Student
+    import main as students
+
+    async with students.app.router.lifespan_context(students.app):
+        await Student.bulk_create([
+            Student(name=f"Student {n}", email=f"student{n}@example.com", password_hash="x",
+                    department=DEPARTMENTS[n % len(DEPARTMENTS)], registration_no=f"REG{n:08d}")
+            for n in range(args.seed_rows)
+        ])
+        ids = await Student.all().values_list("id", flat=True)
+        async with in_process_client(students.app, args.concurrency) as client:
+
+            async def register(worker_id, i):
+                response = await client.post("/api/students/v1_0/register_student", json={
+                    "name": "Bench", "email": next(emails),
+                    "password": "secret", "department": rng.choice(DEPARTMENTS),
+                })
+                response.raise_for_status()
+
+            async def listing(worker_id, i):
+                response = await client.get("/api/students/", params={
+                    "limit": 100, "after_id": rng.choice(ids), "department": rng.choice(DEPARTMENTS)})
+                response.raise_for_status()
+
+            async def lookup(worker_id, i):
+                response = await client.get(f"/api/students/{rng.choice(ids)}")
+                response.raise_for_status()
+
+            return [
+                await measure("students_register", register, args),
+                await measure("students_listing", listing, args),
+                await measure("students_lookup", lookup, args),
+            ]
+
+
+WORKLOADS = {"clicker": clicker_workloads, "gateway": gateway_workloads, "students": students_workloads}
+
+
+def run_worker(args):
+    # Runs one app's workloads in this process and prints the reports
+    sys.path[:0] = [APP_DIRS[args.worker], ROOT]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DB_URL", f"sqlite://{os.path.join(tmp, 'students.db')}")
+        os.environ.setdefault("UPLOAD_DIR", os.path.join(tmp, "uploads"))
+        os.chdir(APP_DIRS[args.worker])
+        reports = asyncio.run(WORKLOADS[args.worker](args, random.Random(args.seed)))
+    print(json.dumps(reports))
+
+
+def run_app(name, args):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name,
+               "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+               "--warmup", str(args.warmup), "--seed", str(args.seed), "--seed-rows", str(args.seed_rows)]
+    result = subprocess.run(command, stdout=subprocess.PIPE, check=True, text=True)
+    # The reports are the last line; anything before it is the app's own output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(args):
+    reports = []
+    for name in args.apps.split(","):
+        runs = [run_app(name, args) for _ in range(args.repeat)]
+        # With --repeat, keep each workload's median run by throughput
+        for results in zip(*runs):
+            ordered = sorted(results, key=lambda report: report["rps"])
+            reports.append(dict(ordered[len(ordered) // 2], runs=len(ordered)))
+    return reports
+
+
+def compare(reports, baseline, tolerance, min_ms):
+    # One row per workload and metric; a row regresses when it is more than
+    # `tolerance` worse than the baseline (and, for latency, at least min_ms worse)
+    previous = {report["name"]: report for report in baseline}
+    rows = []
+    for report in reports:
+        before = previous.get(report["name"])
+        if before is None:
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            old, new = before[metric], report[metric]
+            change = (new - old) / old if old else 0.0
+            if metric in HIGHER_IS_BETTER:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance and new - old >= min_ms
+            rows.append({"name": report["name"], "metric": metric, "baseline": old, "current": new,
+                         "change_pct": round(change * 100, 1), "regressed": regressed})
+    return rows
+
+
+def main(args):
+    if args.worker:
+        run_worker(args)
+        return 0
+    reports = run_suite(args)
+    for report in reports:
+        report["label"] = args.label
+    if not args.baseline:
+        emit(reports, args.output)
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    if isinstance(baseline, dict):  # the output of an earlier comparison run
+        baseline = baseline["reports"]
+    rows = compare(reports, baseline, args.tolerance, args.min_ms)
+    regressions = [row for row in rows if row["regressed"]]
+    emit({"reports": reports, "comparison": rows, "regressions": len(regressions)}, args.output)
+    for row in regressions:
+        print(f"REGRESSION {row['name']} {row['metric']}: {row['baseline']} -> {row['current']} "
+              f"({row['change_pct']:+}%)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with baseline comparison")
+    parser.add_argument("--apps", default="clicker,gateway,students")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0, help="unreported seconds before each workload")
+    parser.add_argument("--seed", type=int, default=1, help="seeds the random scores, ids and departments")
+    parser.add_argument("--seed-rows", type=int, default=10000, help="students in the SQLite database")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per app; the median one is reported")
+    parser.add_argument("--baseline", help="earlier results (from -o) to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--worker", choices=sorted(WORKLOADS), help=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output")
+    sys.exit(main(parser.parse_args()))
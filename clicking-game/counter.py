@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+VISITS_SHARDS = int(os.getenv("VISITS_SHARDS", "8"))
+VISITS_FLUSH_INTERVAL = float(os.getenv("VISITS_FLUSH_INTERVAL", "1.0"))
+VISITS_FLUSH_THRESHOLD = int(os.getenv("VISITS_FLUSH_THRESHOLD", "100"))
+VISITS_MAX_STALENESS = float(os.getenv("VISITS_MAX_STALENESS", "2.0"))
+
+logger = logging.getLogger("clicker.counter")
+
+
+class VisitCounter:
+    # Counts hits in memory and flushes them with INCRBY to one of N shard keys
+    # every flush_interval seconds or after flush_threshold hits. The total is
+    # the sum of all shards (plus the pre-sharding 'visits' key) and is re-read
+    # at most every max_staleness seconds.
+
+    def __init__(self, redis_client, key='visits', shards=VISITS_SHARDS,
+                 flush_interval=VISITS_FLUSH_INTERVAL, flush_threshold=VISITS_FLUSH_THRESHOLD,
+                 max_staleness=VISITS_MAX_STALENESS):
+        self.redis = redis_client
+        self.keys = [f'{key}:{n}' for n in range(max(1, shards))] + [key]
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_staleness = max_staleness
+        self._total = 0
+        self._pending = 0
+        self._in_flight = 0
+        self._read_at = float('-inf')
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._flushes = set()
+
+    @property
+    def value(self):
+        return self._total + self._in_flight + self._pending
+
+    def hit(self):
+        self._pending += 1
+        if self._pending >= self.flush_threshold and not self._flush_lock.locked():
+            task = asyncio.get_running_loop().create_task(self._flush_quietly())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        return self.value
+
+    def stale(self):
+        return time.monotonic() - self._read_at >= self.max_staleness
+
+    def queue_read(self, pipe):
+        # Adds the shard read to a caller-owned pipeline; pass the reply to apply_read
+        pipe.mget(self.keys)
+
+    def apply_read(self, values):
+        self._total = sum(int(v) for v in values if v is not None)
+        self._read_at = time.monotonic()
+
+    async def refresh(self):
+        self.apply_read(await self.redis.mget(self.keys))
+
+    async def flush(self):
+        async with self._flush_lock:
+            count, self._pending = self._pending, 0
+            if not count:
+                return
+            self._in_flight = count
+            try:
+                await self.redis.incrby(random.choice(self.keys[:-1]), count)
+            except BaseException:
+                # Includes cancellation on shutdown: stop() flushes them again
+                self._pending += count
+                raise
+            else:
+                self._total += count
+            finally:
+                self._in_flight = 0
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("visit counter flush failed, will retry")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_quietly()
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        # Called on graceful shutdown so buffered hits are not lost
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+        await self.flush()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("clicker.events")
+
+
+class Subscriber:
+    # One Redis pub/sub connection per worker. Messages are handed to the
+    # handlers registered for their channel; after a dropped connection every
+    # handler is called with None since messages may have been missed.
+
+    def __init__(self, redis_client, retry_delay=1.0):
+        self.redis = redis_client
+        self.retry_delay = retry_delay
+        self._handlers = {}
+        self._task = None
+
+    def on(self, channel, handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def _dispatch(self, channel, data):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(data)
+            except Exception:
+                logger.exception("handler for %s failed", channel)
+
+    async def _run(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self._handlers)
+                while True:
+                    # Poll with a timeout rather than listen() so an idle channel
+                    # doesn't trip the pool's socket timeout
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    channel, data = message["channel"], message["data"]
+                    self._dispatch(channel.decode(), data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("pub/sub connection lost, resubscribing in %.1fs", self.retry_delay)
+                for channel in self._handlers:
+                    self._dispatch(channel, None)
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class Broadcaster:
+    # Fans one encoded message out to every connected stream client. Each client
+    # gets a bounded queue; a client that falls too far behind is disconnected
+    # rather than letting its backlog grow without limit.
+
+    def __init__(self, max_backlog=100):
+        self.max_backlog = max_backlog
+        self.clients = set()
+        self.dropped = 0
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.max_backlog)
+        self.clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.clients.discard(queue)
+
+    def publish(self, message):
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.unsubscribe(queue)
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def stats(self):
+        return {"clients": len(self.clients), "dropped": self.dropped}
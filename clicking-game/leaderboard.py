@@ -0,0 +1,132 @@
+import os
+import time
+
+MODES = ['10sec', '30sec', '60sec']
+DEFAULT_TOP_N = int(os.getenv('LEADERBOARD_TOP_N', '5'))
+LEADERBOARD_CACHE_TTL = float(os.getenv('LEADERBOARD_CACHE_TTL', '5'))
+# Every worker subscribes to this channel to drop its cached copy of a board
+UPDATES_CHANNEL = 'leaderboard_updates'
+
+# Runs atomically inside Redis: folds any legacy JSON list into the sorted set,
+# records the submission only if it beats the user's best, trims to top-N and
+# announces the change on the updates channel.
+# KEYS[1] = sorted set, KEYS[2] = legacy JSON key
+# ARGV[1] = username ('' to only migrate), ARGV[2] = score, ARGV[3] = top-N,
+# ARGV[4] = updates channel, ARGV[5] = mode
+SUBMIT_SCRIPT = """
+local board, legacy = KEYS[1], KEYS[2]
+local raw = redis.call('GET', legacy)
+if raw then
+    local ok, entries = pcall(cjson.decode, raw)
+    if ok and type(entries) == 'table' then
+        for _, entry in ipairs(entries) do
+            if entry.username and tonumber(entry.score) then
+                redis.call('ZADD', board, 'GT', tonumber(entry.score), tostring(entry.username))
+            end
+        end
+    end
+    redis.call('DEL', legacy)
+end
+if ARGV[1] ~= '' then
+    redis.call('ZADD', board, 'GT', ARGV[2], ARGV[1])
+end
+redis.call('ZREMRANGEBYRANK', board, 0, -tonumber(ARGV[3]) - 1)
+if raw or ARGV[1] ~= '' then
+    redis.call('PUBLISH', ARGV[4], ARGV[5])
+end
+return redis.call('ZSCORE', board, ARGV[1])
+"""
+
+
+def top_n_for(mode):
+    # LEADERBOARD_TOP_N_30SEC=10 overrides the default for a single mode
+    return int(os.getenv(f'LEADERBOARD_TOP_N_{mode.upper()}', DEFAULT_TOP_N))
+
+
+class Leaderboard:
+    def __init__(self, redis_client, modes=MODES):
+        self.redis = redis_client
+        self.modes = list(modes)
+        self.top_n = {mode: top_n_for(mode) for mode in self.modes}
+        self._submit = redis_client.register_script(SUBMIT_SCRIPT)
+
+    @staticmethod
+    def key(mode):
+        return f'leaderboard_{mode}'
+
+    @staticmethod
+    def legacy_key(mode):
+        return f'high_scores_{mode}'
+
+    async def submit(self, mode, username, score):
+        best = await self._submit(
+            keys=[self.key(mode), self.legacy_key(mode)],
+            args=[username, score, self.top_n[mode], UPDATES_CHANNEL, mode],
+        )
+        return int(float(best)) if best is not None else None
+
+    async def migrate(self):
+        # Safe to run while old workers are still writing the JSON keys:
+        # anything they write later is folded in on the next submission.
+        for mode in self.modes:
+            await self._submit(keys=[self.key(mode), self.legacy_key(mode)], args=['', 0, self.top_n[mode], UPDATES_CHANNEL, mode])
+
+    async def top(self, mode):
+        return self.parse_top(await self.redis.zrevrange(self.key(mode), 0, self.top_n[mode] - 1, withscores=True))
+
+    def queue_top(self, pipe, mode):
+        # Adds the read to a caller-owned pipeline; decode the reply with parse_top
+        pipe.zrevrange(self.key(mode), 0, self.top_n[mode] - 1, withscores=True)
+
+    @staticmethod
+    def parse_top(entries):
+        return [{"username": member.decode(), "score": int(score)} for member, score in entries]
+
+
+class SnapshotCache:
+    # Per-worker copy of each mode's top-N list. Entries expire after ttl
+    # seconds and are dropped early when another worker announces a change.
+
+    def __init__(self, ttl=LEADERBOARD_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._generations = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, mode):
+        entry = self._entries.get(mode)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def generation(self, mode):
+        return self._epoch, self._generations.get(mode, 0)
+
+    def put(self, mode, scores, generation):
+        # A read that started before an invalidation must not repopulate the cache
+        if generation == self.generation(mode):
+            self._entries[mode] = (time.monotonic() + self.ttl, scores)
+
+    def invalidate(self, mode=None):
+        if mode is None:
+            self._epoch += 1
+            self._entries.clear()
+        else:
+            self._generations[mode] = self._generations.get(mode, 0) + 1
+            self._entries.pop(mode, None)
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+        }
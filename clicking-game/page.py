@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import os
+from html import escape
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Serve CSS/JS as separate cacheable files instead of inlining them in every page
+EXTERNAL_ASSETS = os.getenv("CLICKER_EXTERNAL_ASSETS", "false").lower() in ("1", "true", "yes")
+
+TEMPLATE = '''<!DOCTYPE html>
+<html>
+    <head>
+        <title>The Obvious Clicker Game</title>
+        <link href="https://fonts.googleapis.com/css2?family=Share+Tech+Mono&display=swap" rel="stylesheet">
+        <!--styles-->
+    </head>
+    <body>
+        <h1>THE OBVIOUS CLICKER GAME</h1>
+        <p>Total Visits:</p>
+        <div class="counter">
+            <!--counter-->
+        </div>
+
+        <div class="game-container">
+            <h2>SPEED CLICKING CHALLENGE</h2>
+            <div class="mode-select">
+                <button class="button mode-btn" data-mode="10">10 SEC</button>
+                <button class="button mode-btn" data-mode="30">30 SEC</button>
+                <button class="button mode-btn" data-mode="60">60 SEC</button>
+            </div>
+            <p>Mode: <span id="currentMode">10 SEC</span></p>
+            <p>Score: <span id="score" class="score">0</span></p>
+            <p>Time Left: <span id="timer">10</span>s</p>
+            <button id="clickBtn" class="button click-button">CLICK ME 🎯</button>
+            <button id="resetBtn" class="button">RESET</button>
+            <input type="text" id="username" placeholder="ENTER CODENAME">
+            <button id="saveScore" class="button">SAVE SCORE</button>
+        </div>
+
+        <div class="leaderboard">
+            <h2>TOP OPERATORS</h2>
+            <!--leaderboard-->
+        </div>
+
+        <audio id="clickSound" src="https://www.soundjay.com/button/button-09a.mp3" preload="auto"></audio>
+        <audio id="gameOverSound" src="https://www.soundjay.com/button/button-21.mp3" preload="auto"></audio>
+
+        <!--scripts-->
+    </body>
+</html>
+'''
+
+
+class Asset:
+    def __init__(self, name, media_type):
+        with open(os.path.join(STATIC_DIR, name), "rb") as fh:
+            self.body = fh.read()
+        self.name = name
+        self.media_type = media_type
+        digest = hashlib.sha256(self.body).hexdigest()[:16]
+        self.etag = f'"{digest}"'
+        # The content hash in the URL lets browsers cache the file forever
+        self.url = f"/static/{name}?v={digest}"
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=9)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body)
+
+    def negotiate(self, accept_encoding):
+        # Pick the best precompressed body the client accepts
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encoded:
+                return self.encoded[encoding], encoding
+        return self.body, None
+
+
+ASSETS = {
+    "clicker.css": Asset("clicker.css", "text/css; charset=utf-8"),
+    "clicker.js": Asset("clicker.js", "application/javascript; charset=utf-8"),
+}
+
+
+def _asset_tags():
+    css, js = ASSETS["clicker.css"], ASSETS["clicker.js"]
+    if EXTERNAL_ASSETS:
+        return (f'<link href="{css.url}" rel="stylesheet">',
+                f'<script src="{js.url}"></script>')
+    return (f'<style>\n{css.body.decode()}</style>',
+            f'<script>\n{js.body.decode()}</script>')
+
+
+def _compile(template):
+    # Split the page once at import time into static byte chunks around the two
+    # dynamic slots, so a request only has to build the counter and leaderboard.
+    styles, scripts = _asset_tags()
+    html = template.replace("<!--styles-->", styles).replace("<!--scripts-->", scripts)
+    head, rest = html.split("<!--counter-->")
+    middle, tail = rest.split("<!--leaderboard-->")
+    return head.encode(), middle.encode(), tail.encode()
+
+
+HEAD, MIDDLE, TAIL = _compile(TEMPLATE)
+DIGITS = [f'<div class="digit">{d}</div>'.encode() for d in "0123456789"]
+_mode_heads = {}
+
+
+def _mode_head(mode):
+    if mode not in _mode_heads:
+        _mode_heads[mode] = f'<div class="mode-scores" data-mode="{escape(mode)}"><h3>{escape(mode.upper())} Mode</h3><ul>'.encode()
+    return _mode_heads[mode]
+
+
+def render_counter(visits):
+    return b"".join(DIGITS[int(d)] for d in str(visits).zfill(7))  # Pad with zeros to 7 digits
+
+
+def render_leaderboard(all_scores):
+    parts = []
+    for mode, scores in all_scores.items():
+        parts.append(_mode_head(mode))
+        for score in scores:
+            parts.append(f"<li style='color: var(--accent);'>{escape(score['username'])}: {score['score']}</li>".encode())
+        parts.append(b"</ul></div>")
+    return b"".join(parts)
+
+
+def render_page(visits, all_scores):
+    return b"".join((HEAD, render_counter(visits), MIDDLE, render_leaderboard(all_scores), TAIL))
@@ -0,0 +1,132 @@
+let score = 0;
+let timeLeft = 10;
+let gameActive = false;
+let timer;
+let currentMode = 10;
+const clickSound = document.getElementById('clickSound');
+const gameOverSound = document.getElementById('gameOverSound');
+
+// Click effect
+document.addEventListener('click', (e) => {
+    const effect = document.createElement('div');
+    effect.className = 'click-effect';
+    effect.style.left = e.clientX + 'px';
+    effect.style.top = e.clientY + 'px';
+    effect.style.border = '2px solid var(--accent)';
+    effect.style.width = '20px';
+    effect.style.height = '20px';
+    effect.style.borderRadius = '50%';
+    document.body.appendChild(effect);
+    setTimeout(() => effect.remove(), 500);
+});
+
+// Mode selection
+document.querySelectorAll('.mode-btn').forEach(btn => {
+    btn.addEventListener('click', () => {
+        currentMode = parseInt(btn.dataset.mode);
+        document.getElementById('currentMode').textContent = currentMode + ' SEC';
+        resetGame();
+    });
+});
+
+document.getElementById('clickBtn').addEventListener('click', () => {
+    clickSound.currentTime = 0;
+    clickSound.play();
+    if (!gameActive) {
+        startGame();
+    }
+    score++;
+    document.getElementById('score').textContent = score;
+});
+
+document.getElementById('resetBtn').addEventListener('click', resetGame);
+
+document.getElementById('saveScore').addEventListener('click', async () => {
+    const username = document.getElementById('username').value;
+    if (!username) {
+        alert('Please enter a codename!');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/scores', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                username: username,
+                score: score,
+                mode: currentMode + 'sec'
+            })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.detail || 'Could not save score');
+        }
+        // The leaderboard itself is updated by the live stream below
+    } catch (error) {
+        console.error('Error:', error);
+    }
+});
+
+function startGame() {
+    gameActive = true;
+    timeLeft = currentMode;
+    score = 0;
+    document.getElementById('score').textContent = score;
+
+    timer = setInterval(() => {
+        timeLeft--;
+        document.getElementById('timer').textContent = timeLeft;
+
+        if (timeLeft <= 0) {
+            endGame();
+        }
+    }, 1000);
+}
+
+function endGame() {
+    gameActive = false;
+    clearInterval(timer);
+    gameOverSound.play();
+    alert(`SEQUENCE COMPLETE!\nFinal Score: ${score}`);
+}
+
+function resetGame() {
+    gameActive = false;
+    clearInterval(timer);
+    score = 0;
+    timeLeft = currentMode;
+    document.getElementById('score').textContent = score;
+    document.getElementById('timer').textContent = timeLeft;
+}
+
+// Live leaderboard and visit counter pushed by the server
+function renderVisits(value) {
+    const counter = document.querySelector('.counter');
+    counter.replaceChildren(...String(value).padStart(7, '0').split('').map(d => {
+        const digit = document.createElement('div');
+        digit.className = 'digit';
+        digit.textContent = d;
+        return digit;
+    }));
+}
+
+function renderLeaderboard(mode, scores) {
+    const list = document.querySelector(`.mode-scores[data-mode="${mode}"] ul`);
+    if (!list) return;
+    list.replaceChildren(...scores.map(entry => {
+        const item = document.createElement('li');
+        item.style.color = 'var(--accent)';
+        item.textContent = `${entry.username}: ${entry.score}`;
+        return item;
+    }));
+}
+
+const stream = new EventSource('/api/stream');
+stream.addEventListener('visits', (e) => renderVisits(JSON.parse(e.data).value));
+stream.addEventListener('leaderboard', (e) => {
+    const data = JSON.parse(e.data);
+    renderLeaderboard(data.mode, data.scores);
+});
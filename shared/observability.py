@@ -0,0 +1,226 @@
+# Metrics and tracing shared by the gateway, the students service and the
+# clicker. Each app calls setup(app, "<service>") once; see shared/README.md.
+import logging
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger("observability")
+
+# Seconds; finer at the low end where most API calls land
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests served", ["service", "method", "route", "status"])
+LATENCY = Histogram("http_request_duration_seconds", "Time to serve an HTTP request",
+                    ["service", "method", "route"], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served", ["service"],
+                  multiprocess_mode="livesum")
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database query time", ["service"], buckets=LATENCY_BUCKETS)
+UPSTREAM_EVENTS = Counter("upstream_events_total", "Upstream requests, failures, retries, hedges and short circuits",
+                          ["service", "upstream", "event"])
+UPSTREAM_CIRCUIT = Gauge("upstream_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+                         ["service", "upstream"], multiprocess_mode="livemax")
+UPSTREAM_RETRY_TOKENS = Gauge("upstream_retry_tokens", "Retry budget tokens left", ["service", "upstream"],
+                              multiprocess_mode="livemin")
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+_tracer = None
+
+
+def configure_tracing(service):
+    # Tracing is on when an OTLP endpoint is configured and the OpenTelemetry
+    # packages are installed; otherwise every tracing hook here is a no-op
+    global _tracer
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but OpenTelemetry is not installed; tracing is off")
+        return None
+    if _tracer is None:
+        # Sampling follows OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service)}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer("observability")
+    return _tracer
+
+
+class ObservabilityMiddleware:
+    # Pure ASGI, so streamed responses are timed to their last byte.
+    # Server-sent event streams stay open indefinitely and are only counted,
+    # not timed.
+
+    def __init__(self, app, service):
+        self.app = app
+        self.service = service
+        self.in_flight = IN_FLIGHT.labels(service)
+        self._latency = {}
+
+    def _observe(self, method, route, status, elapsed):
+        REQUESTS.labels(self.service, method, route, status).inc()
+        if elapsed is None:
+            return
+        key = (method, route)
+        child = self._latency.get(key)
+        if child is None:
+            child = self._latency[key] = LATENCY.labels(self.service, method, route)
+        child.observe(elapsed)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        streaming_events = False
+        span = token = None
+        if _tracer is not None:
+            span, token = _start_server_span(scope)
+
+        async def send_wrapper(message):
+            nonlocal status, streaming_events
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming_events = True
+                if span is not None:
+                    _inject_trace_id(span, message)
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            # The matched route's template (e.g. /api/students/{student_id})
+            # keeps ids out of the labels; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            elapsed = None if streaming_events else time.perf_counter() - started
+            self._observe(scope["method"], route, str(status), elapsed)
+            if span is not None:
+                _end_server_span(span, token, scope["method"], route, status)
+
+
+def _start_server_span(scope):
+    from opentelemetry import context, propagate, trace
+
+    carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", ())}
+    span = _tracer.start_span(f"{scope['method']} {scope['path']}", context=propagate.extract(carrier),
+                              kind=trace.SpanKind.SERVER)
+    span.set_attribute("http.request.method", scope["method"])
+    span.set_attribute("url.path", scope["path"])
+    token = context.attach(trace.set_span_in_context(span))
+    return span, token
+
+
+def _inject_trace_id(span, message):
+    # Lets a client find the trace for a slow response
+    trace_id = format(span.get_span_context().trace_id, "032x")
+    message.setdefault("headers", [])
+    message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id.encode())]
+
+
+def _end_server_span(span, token, method, route, status):
+    from opentelemetry import context, trace
+
+    span.update_name(f"{method} {route}")
+    span.set_attribute("http.route", route)
+    span.set_attribute("http.response.status_code", status)
+    if status >= 500:
+        span.set_status(trace.Status(trace.StatusCode.ERROR))
+    span.end()
+    context.detach(token)
+
+
+async def metrics_endpoint(request: Request):
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several uvicorn workers: merge what every worker wrote to the directory
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def setup(app, service, metrics_path="/metrics"):
+    configure_tracing(service)
+    app.add_middleware(ObservabilityMiddleware, service=service)
+    app.add_api_route(metrics_path, metrics_endpoint, include_in_schema=False)
+
+
+def instrument_httpx_client(client):
+    # Outgoing requests get a client span and a W3C traceparent header
+    if _tracer is None:
+        return client
+    try:
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    except ImportError:
+        logger.warning("opentelemetry-instrumentation-httpx is not installed; upstream calls are not traced")
+        return client
+    HTTPXClientInstrumentor.instrument_client(client)
+    return client
+
+
+def instrument_redis():
+    # Every Redis command (redis-py, sync and asyncio) becomes a client span
+    if _tracer is None:
+        return
+    try:
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
+    except ImportError:
+        logger.warning("opentelemetry-instrumentation-redis is not installed; Redis calls are not traced")
+        return
+    RedisInstrumentor().instrument()
+
+
+def query_listener(service):
+    # For the students service's query hook: times every query into
+    # db_query_duration_seconds and, with tracing on, records it as a span
+    histogram = QUERY_LATENCY.labels(service)
+
+    def listener(sql, shape, elapsed_ms, rows, error):
+        histogram.observe(elapsed_ms / 1000)
+        if _tracer is None:
+            return
+        from opentelemetry import trace
+
+        end = time.time_ns()
+        span = _tracer.start_span(shape.split(" ", 1)[0], kind=trace.SpanKind.CLIENT,
+                                  start_time=end - int(elapsed_ms * 1e6))
+        span.set_attribute("db.query.text", shape)
+        span.set_attribute("db.response.returned_rows", rows)
+        if error is not None:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+        span.end(end_time=end)
+
+    return listener
+
+
+def upstream_listener(service, upstream):
+    # For the gateway's ResiliencePolicy listeners: counts each event into
+    # upstream_events_total and keeps the breaker and retry budget gauges current
+    events = {}
+    state = UPSTREAM_CIRCUIT.labels(service, upstream)
+    tokens = UPSTREAM_RETRY_TOKENS.labels(service, upstream)
+
+    def listener(policy, event):
+        if event is not None:
+            counter = events.get(event)
+            if counter is None:
+                counter = events[event] = UPSTREAM_EVENTS.labels(service, upstream, event)
+            counter.inc()
+        state.set(CIRCUIT_STATES.get(policy.breaker.state, 0))
+        tokens.set(policy.budget.tokens)
+
+    return listener
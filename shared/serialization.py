@@ -0,0 +1,155 @@
+# Payload encoding shared by the apps: JSON through orjson when it is
+# installed, and MessagePack for values cached in Redis and for callers that
+# ask for it with an Accept header. Both libraries are optional;
+# without them everything falls back to the standard json module.
+import datetime
+import enum
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+# Format of values the apps put in Redis; readers accept either
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "msgpack" if msgpack is not None else "json")
+
+
+def _default(value):
+    # What orjson handles natively, for the standard json module and msgpack
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(value):
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def loads_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_msgpack(value):
+    return msgpack.packb(value, default=_default)
+
+
+def loads_msgpack(data):
+    return msgpack.unpackb(data)
+
+
+def dumps(value, serializer=CACHE_SERIALIZER):
+    # For cached values: compact and fast to decode, readable by any worker
+    if serializer == "msgpack" and msgpack is not None:
+        return dumps_msgpack(value)
+    return dumps_json(value)
+
+
+def loads(data):
+    # Cached values are objects or arrays. Ones written as JSON, before the
+    # switch to MessagePack or by a worker without it, start with { or [ and
+    # still load
+    if data[:1] in (b"{", b"[") or msgpack is None:
+        return loads_json(data)
+    return loads_msgpack(data)
+
+
+def _accept_q(accept):
+    # {media type: q} from an Accept header
+    weights = {}
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type:
+            weights[media_type.lower()] = max(q, weights.get(media_type.lower(), 0.0))
+    return weights
+
+
+def negotiate(accept):
+    # MessagePack only for callers that ask for it by name and rank it at
+    # least as high as JSON; browsers and */* clients keep getting JSON
+    if msgpack is None:
+        return JSON
+    weights = _accept_q(accept)
+    wanted = max((weights.get(media_type, 0.0) for media_type in MSGPACK_TYPES), default=0.0)
+    if wanted <= 0:
+        return JSON
+    if wanted <= weights.get(JSON, -1.0) or wanted < weights.get("*/*", 0.0):
+        return JSON
+    return MSGPACK
+
+
+def _is_json(headers):
+    for name, value in headers:
+        if name == b"content-type":
+            return value.split(b";")[0].strip().lower() == JSON.encode()
+    return False
+
+
+class MessagePackMiddleware:
+    # Routes keep FastAPI's own JSON responses. Only for callers whose Accept
+    # header asks for MessagePack is a successful JSON body decoded and
+    # re-encoded, so JSON clients pay nothing but the Vary header. Errors and
+    # streamed (NDJSON, SSE) responses are left alone.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), None)
+        wanted = negotiate(accept) == MSGPACK
+        held, chunks = None, []
+
+        async def send_negotiated(message):
+            nonlocal held
+            if message["type"] == "http.response.start":
+                if not _is_json(message["headers"]):
+                    await send(message)
+                    return
+                message = {**message, "headers": [*message["headers"], (b"vary", b"Accept")]}
+                if wanted and message["status"] < 400:
+                    held = message
+                else:
+                    await send(message)
+                return
+            if held is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = held["headers"]
+            if body:
+                body = dumps_msgpack(loads_json(body))
+                headers = [(name, value) for name, value in headers if name not in (b"content-type", b"content-length")]
+                headers += [(b"content-type", MSGPACK.encode()), (b"content-length", str(len(body)).encode())]
+            await send({**held, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_negotiated)
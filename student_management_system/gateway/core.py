@@ -0,0 +1,110 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import httpx
+import os
+from resilience import CircuitOpenError, ResiliencePolicy
+
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5"))
+# HTTP/2 needs TLS (https://) upstreams; plain http:// stays on HTTP/1.1 keep-alive
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+
+# Connection-level headers that must not be forwarded by a proxy (RFC 9110 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host",
+}
+
+
+def forwardable_headers(headers):
+    # Raw (name, value) byte pairs, so repeated headers like Set-Cookie survive
+    return [(k.lower(), v) for k, v in headers.raw if k.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS]
+
+
+def upstream_headers(request: Request):
+    # The client's headers as the students service should see them
+    headers = forwardable_headers(request.headers)
+    if request.client:
+        headers.append((b"x-forwarded-for", request.client.host.encode("latin-1")))
+    headers.append((b"x-forwarded-proto", request.url.scheme.encode("latin-1")))
+    return headers
+
+
+def create_client():
+    # One client per gateway process, shared by every route so connections
+    # to the upstream services are kept alive and reused.
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            UPSTREAM_READ_TIMEOUT,
+            connect=UPSTREAM_CONNECT_TIMEOUT,
+            pool=UPSTREAM_POOL_TIMEOUT,
+        ),
+        http2=UPSTREAM_HTTP2,
+    )
+
+
+class Upstream:
+    def __init__(self, name, base_url, policy=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.policy = policy or ResiliencePolicy.from_env(name)
+        self.client = None
+
+    def bind(self, client):
+        self.client = client
+
+    async def send(self, method, url, **kwargs):
+        # Every upstream call goes through the resilience policy: per-upstream
+        # timeout, circuit breaker, retries/hedging for idempotent requests
+        # whose body (if any) can be sent again.
+        if self.policy.timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(
+                self.policy.timeout, connect=UPSTREAM_CONNECT_TIMEOUT, pool=UPSTREAM_POOL_TIMEOUT)
+
+        # An async iterator (forward()'s request.stream()) is consumed by the first attempt
+        replayable = not hasattr(kwargs.get("content"), "__aiter__")
+
+        async def attempt():
+            request = self.client.build_request(method, url, **kwargs)
+            return await self.client.send(request, stream=True)
+
+        try:
+            return await self.policy.execute(attempt, method, replayable=replayable)
+        except CircuitOpenError as exc:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Service unavailable: {self.name} is failing, not sending requests for now",
+                headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+            )
+        except httpx.RequestError as exc:
+            raise HTTPException(status_code=503, detail=f"Service unavailable: {str(exc)}")
+
+    async def forward(self, request: Request, path: str):
+        # Byte-for-byte pass-through: the request body is streamed upstream and
+        # the response body is streamed back without being parsed.
+        headers = upstream_headers(request)
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+        response = await self.send(
+            request.method,
+            httpx.URL(f"{self.base_url}{path}", query=request.url.query.encode("latin-1")),
+            headers=headers,
+            content=request.stream() if has_body else None,
+        )
+        proxied = StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            background=BackgroundTask(response.aclose),
+        )
+        proxied.raw_headers = forwardable_headers(response.headers)
+        return proxied
@@ -1,22 +1,75 @@
-from fastapi import FastAPI, HTTPException
-import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 import os
-
-app = FastAPI()
+from core import Upstream, create_client
+from response_cache import ResponseCache
+from shared.observability import instrument_httpx_client, setup as setup_observability, upstream_listener
 
 STUDENTS_SERVICE_URL = os.getenv("STUDENTS_SERVICE_URL", "http://students:8000")
+# Seconds a cached read is served without asking the students service, for
+# responses that don't say themselves; 0 turns caching off for that route
+STUDENT_CACHE_TTL = float(os.getenv("GATEWAY_CACHE_TTL_STUDENT", "10"))
+LISTING_CACHE_TTL = float(os.getenv("GATEWAY_CACHE_TTL_LISTING", "5"))
+SEARCH_CACHE_TTL = float(os.getenv("GATEWAY_CACHE_TTL_SEARCH", "30"))
+
+students = Upstream("students", STUDENTS_SERVICE_URL)
+response_cache = ResponseCache()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with create_client() as client:
+        students.bind(instrument_httpx_client(client))
+        yield
+
+app = FastAPI(lifespan=lifespan)
+setup_observability(app, "gateway")
+students.policy.listeners.append(upstream_listener("gateway", students.name))
+
+async def cached(request: Request, path, ttl):
+    if ttl <= 0:
+        return await students.forward(request, path)
+    return await response_cache.serve(request, students, path, ttl)
+
+async def forward_write(request: Request, path):
+    response = await students.forward(request, path)
+    if response.status_code < 400:
+        response_cache.invalidate("/api/students")
+    return response
 
 @app.post("/api/v1_0/register_student")
-async def register_student(student_data: dict):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{STUDENTS_SERVICE_URL}/api/students/v1_0/register_student",
-                json=student_data
-            )
-            response.raise_for_status()  # Raise exception for 4xx and 5xx responses
-            return response.json()
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=503, detail=f"Service unavailable: {str(exc)}")
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(status_code=exc.response.status_code, detail=exc.response.text)
\ No newline at end of file
+async def register_student(request: Request):
+    return await forward_write(request, "/api/students/v1_0/register_student")
+
+@app.post("/api/v1_0/register_students")
+async def register_students(request: Request):
+    # Bulk upload (JSON array, NDJSON or CSV), streamed through unparsed
+    return await forward_write(request, "/api/students/v1_0/register_students")
+
+@app.get("/internal/upstreams")
+async def upstream_stats():
+    # Circuit breaker state plus request/retry/hedge counters per upstream
+    return {students.name: students.policy.stats()}
+
+@app.get("/internal/cache")
+async def cache_stats():
+    return response_cache.stats()
+
+# Reads that opt in to the response cache; streams and event feeds stay uncached
+@app.get("/api/students/")
+async def list_students(request: Request):
+    return await cached(request, "/api/students/", LISTING_CACHE_TTL)
+
+@app.get("/api/students/search")
+async def search_students(request: Request):
+    return await cached(request, "/api/students/search", SEARCH_CACHE_TTL)
+
+@app.get("/api/students/{student_id:int}")
+async def get_student(request: Request, student_id: int):
+    return await cached(request, f"/api/students/{student_id}", STUDENT_CACHE_TTL)
+
+# Everything else under /api/students is passed straight through to the students service
+@app.api_route("/api/students/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def students_proxy(request: Request, path: str):
+    if request.method == "GET":
+        return await students.forward(request, f"/api/students/{path}")
+    return await forward_write(request, f"/api/students/{path}")
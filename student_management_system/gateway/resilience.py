@@ -0,0 +1,234 @@
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+# Upstream answers that mean "try again later" rather than "your request is wrong"
+RETRYABLE_STATUS = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive failures; open ->
+    # half_open after `reset_timeout` seconds, when a single probe request is
+    # let through; the probe's outcome closes or re-opens the circuit.
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def before_request(self):
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # A probe that never reported back (e.g. the client went away) is
+            # given up on after reset_timeout so the circuit can't get stuck
+            now = time.monotonic()
+            if self._probing and now - self._probe_started < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probing = True
+            self._probe_started = now
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    # Every request earns `ratio` of a retry token; a retry or hedge spends a
+    # whole one. `min_per_second` tokens trickle in regardless, so low-traffic
+    # upstreams can still retry. Caps retries at roughly ratio * traffic and
+    # stops retry storms when an upstream is struggling.
+
+    def __init__(self, ratio=0.2, min_per_second=5.0, max_tokens=50.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._refilled_at = time.monotonic()
+
+    def _refill(self, amount):
+        self.tokens = min(self.max_tokens, self.tokens + amount)
+
+    def deposit(self):
+        now = time.monotonic()
+        self._refill(self.ratio + (now - self._refilled_at) * self.min_per_second)
+        self._refilled_at = now
+
+    def withdraw(self):
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def _env(name, key, default, cast=float):
+    value = os.getenv(f"{name.upper()}_{key}", default)
+    return None if value is None else cast(value)
+
+
+class ResiliencePolicy:
+    def __init__(self, name, timeout=None, retries=2, backoff_base=0.05, backoff_cap=1.0,
+                 hedge_delay=0.0, breaker=None, budget=None):
+        self.name = name
+        self.timeout = timeout  # None keeps the shared client's read timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_delay = hedge_delay  # 0 turns hedging off
+        self.breaker = breaker or CircuitBreaker(name)
+        self.budget = budget or RetryBudget()
+        self.counters = dict.fromkeys(
+            ("requests", "failures", "retries", "retries_denied", "short_circuited", "hedges", "hedge_wins"), 0)
+        # Callables taking (policy, event): event is a counter name, or None
+        # once a request succeeded, e.g. to export metrics
+        self.listeners = []
+
+    @classmethod
+    def from_env(cls, name):
+        # e.g. STUDENTS_TIMEOUT=2 STUDENTS_RETRIES=1 STUDENTS_HEDGE_DELAY=0.2
+        return cls(
+            name,
+            timeout=_env(name, "TIMEOUT", None),
+            retries=_env(name, "RETRIES", "2", int),
+            backoff_base=_env(name, "BACKOFF_BASE", "0.05"),
+            backoff_cap=_env(name, "BACKOFF_CAP", "1.0"),
+            hedge_delay=_env(name, "HEDGE_DELAY", "0"),
+            breaker=CircuitBreaker(
+                name,
+                failure_threshold=_env(name, "BREAKER_FAILURES", "5", int),
+                reset_timeout=_env(name, "BREAKER_RESET", "10"),
+            ),
+            budget=RetryBudget(ratio=_env(name, "RETRY_BUDGET_RATIO", "0.2")),
+        )
+
+    def stats(self):
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "opened": self.breaker.opened_count,
+            "retry_tokens": round(self.budget.tokens, 2),
+            **self.counters,
+        }
+
+    def _count(self, event):
+        if event is not None:
+            self.counters[event] += 1
+        for listener in self.listeners:
+            listener(self, event)
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads retries out so clients don't retry in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def execute(self, send, method, replayable=True):
+        # `send` performs one attempt and returns an httpx.Response. Only
+        # idempotent methods are retried or hedged, and only when `send` can
+        # be called again: a streamed request body (replayable=False) can only
+        # be read once.
+        idempotent = replayable and method.upper() in IDEMPOTENT_METHODS
+        self._count("requests")
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                self._count("short_circuited")
+                raise
+            try:
+                if idempotent and self.hedge_delay > 0:
+                    response = await self._hedged(send)
+                else:
+                    response = await send()
+            except httpx.RequestError as exc:
+                failed, response, error = True, None, exc
+            else:
+                failed = response.status_code in RETRYABLE_STATUS
+            if not failed:
+                self.breaker.record_success()
+                self._count(None)
+                return response
+            self.breaker.record_failure()
+            self._count("failures")
+            if not idempotent or attempt >= self.retries:
+                if response is None:
+                    raise error
+                return response
+            if not self.budget.withdraw():
+                self._count("retries_denied")
+                if response is None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+            self._count("retries")
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def _hedged(self, send):
+        # Send a second copy if the first hasn't answered within hedge_delay
+        # and return whichever answers first. Every other attempt is cancelled
+        # and its response closed, also when our caller is cancelled.
+        first = asyncio.ensure_future(send())
+        tasks, winner = [first], None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+            if done or not self.budget.withdraw():
+                response = await first
+                winner = first
+                return response
+            self._count("hedges")
+            second = asyncio.ensure_future(send())
+            tasks.append(second)
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    winner = winners[0]
+                    if winner is second:
+                        self._count("hedge_wins")
+                    return winner.result()
+                error = next(iter(done)).exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is not winner:
+                    task.cancel()
+                    task.add_done_callback(_close_response)
+
+
+def _close_response(task):
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
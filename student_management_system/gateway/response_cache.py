@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+from fastapi import Request
+from fastapi.responses import Response
+
+from core import forwardable_headers, upstream_headers
+
+GATEWAY_CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Bigger responses are passed on but never stored
+GATEWAY_CACHE_MAX_ENTRY_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+# Rough per-entry bookkeeping cost, so many tiny entries still count towards the limit
+ENTRY_OVERHEAD = 512
+# The gateway answers conditional requests itself; upstream only sees its own
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since", "if-match", "if-unmodified-since", "cache-control"}
+# Stored responses don't carry these; they are worked out per reply
+UNSTORED_HEADERS = {"content-length", "age", "date", "x-cache"}
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def canonical_query(request: Request):
+    # ?b=2&a=1 and ?a=1&b=2 are the same request
+    return urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+
+
+def etag_matches(if_none_match, etag):
+    # Weak comparison (RFC 9110 13.1.2), which is what If-None-Match uses
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+
+class CachedResponse:
+    def __init__(self, status_code, headers, body, ttl, stored_at=None):
+        self.status_code = status_code
+        self.headers = [(k, v) for k, v in headers if k.decode("latin-1") not in UNSTORED_HEADERS]
+        self.body = body
+        self.ttl = ttl
+        self.stored_at = stored_at if stored_at is not None else time.monotonic()
+        self.etag = self.header(b"etag")
+        # Only an upstream-issued ETag is worth revalidating with
+        self.validator = self.etag
+        self.size = len(body) + sum(len(k) + len(v) for k, v in self.headers) + ENTRY_OVERHEAD
+
+    def header(self, name):
+        for key, value in self.headers:
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    def ensure_etag(self):
+        # Lets clients revalidate even when the upstream sent no validator
+        if self.etag is None:
+            self.etag = f'W/"{hashlib.sha1(self.body).hexdigest()}"'
+            self.headers.append((b"etag", self.etag.encode("latin-1")))
+
+    def age(self):
+        return time.monotonic() - self.stored_at
+
+    def fresh(self):
+        return self.age() < self.ttl
+
+    def refreshed(self):
+        return CachedResponse(self.status_code, self.headers, self.body, self.ttl)
+
+
+class ResponseCache:
+    # Shared by the GET routes that opt in through `serve`. Entries are keyed
+    # on method, path, sorted query string, Accept, Accept-Encoding and the
+    # caller's credentials, and evicted least recently used first once the
+    # stored bytes pass `max_bytes`. Identical requests that arrive while one
+    # is being fetched wait for it instead of going upstream themselves.
+
+    def __init__(self, max_bytes=GATEWAY_CACHE_MAX_BYTES, max_entry_bytes=GATEWAY_CACHE_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.bytes = 0
+        self.counters = dict.fromkeys(
+            ("hits", "misses", "revalidated", "coalesced", "not_modified", "stored", "uncacheable",
+             "evictions", "invalidations"), 0)
+
+    @staticmethod
+    def key(request: Request, path):
+        credentials = request.headers.get("authorization")
+        scope = hashlib.sha1(credentials.encode("latin-1")).hexdigest() if credentials else None
+        return (request.method, path, canonical_query(request), request.headers.get("accept", ""),
+                request.headers.get("accept-encoding", ""), scope)
+
+    async def serve(self, request: Request, upstream, path, ttl):
+        # `ttl` is the route's freshness lifetime when the upstream response
+        # doesn't give one; the upstream's own Cache-Control takes precedence
+        client_cc = parse_cache_control(request.headers.get("cache-control"))
+        if "no-store" in client_cc:
+            entry = await self._fetch(request, upstream, path, None, ttl)
+            return self._reply(request, entry, "BYPASS")
+        key = self.key(request, path)
+        entry = self._entries.get(key)
+        if entry is not None and entry.fresh() and "no-cache" not in client_cc:
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return self._reply(request, entry, "HIT")
+
+        while key in self._inflight:
+            pending = self._inflight[key]
+            self.counters["coalesced"] += 1
+            try:
+                return self._reply(request, await asyncio.shield(pending), "COALESCED")
+            except asyncio.CancelledError:
+                # Only the leader was cancelled (its client went away): the
+                # first follower to wake up fetches instead
+                if not pending.cancelled():
+                    raise
+            entry = self._entries.get(key)
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            fetched, outcome = await self._refresh(request, upstream, path, key, entry, ttl)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as exc:
+            pending.set_exception(exc)
+            # Nobody else may be waiting; don't warn about an unread exception
+            pending.exception()
+            raise
+        else:
+            pending.set_result(fetched)
+        finally:
+            del self._inflight[key]
+        return self._reply(request, fetched, outcome)
+
+    async def _refresh(self, request, upstream, path, key, stale, ttl):
+        fetched = await self._fetch(request, upstream, path, stale, ttl)
+        if fetched.status_code == 304 and stale is not None:
+            # Upstream confirmed the stored copy; restart its freshness
+            self.counters["revalidated"] += 1
+            fetched = stale.refreshed()
+            self._store(key, fetched)
+            return fetched, "REVALIDATED"
+        self.counters["misses"] += 1
+        if fetched.ttl is None:
+            self.counters["uncacheable"] += 1
+            self._drop(key)
+        else:
+            fetched.ensure_etag()
+            self._store(key, fetched)
+        return fetched, "MISS"
+
+    async def _fetch(self, request, upstream, path, stale, ttl):
+        headers = [(k, v) for k, v in upstream_headers(request) if k.decode("latin-1") not in CONDITIONAL_HEADERS]
+        if stale is not None and stale.validator is not None:
+            headers.append((b"if-none-match", stale.validator.encode("latin-1")))
+        url = httpx.URL(f"{upstream.base_url}{path}", query=canonical_query(request).encode("latin-1"))
+        response = await upstream.send(request.method, url, headers=headers)
+        try:
+            # Raw bytes, so a stored body still matches its Content-Encoding
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        return CachedResponse(response.status_code, forwardable_headers(response.headers), body,
+                              self._lifetime(request, response, body, ttl))
+
+    def _lifetime(self, request, response, body, ttl):
+        # Seconds the response may be served without asking upstream, 0 for
+        # "store but revalidate every time", None for "don't store"
+        if response.status_code != 200 or len(body) > self.max_entry_bytes:
+            return None
+        if "vary" in response.headers and response.headers["vary"].strip() == "*":
+            return None
+        directives = parse_cache_control(response.headers.get("cache-control"))
+        if "no-store" in directives:
+            return None
+        # Per-caller responses are only kept under the caller's own credentials
+        if "private" in directives and "authorization" not in request.headers:
+            return None
+        if "no-cache" in directives:
+            return 0
+        for name in ("s-maxage", "max-age"):
+            if directives.get(name, "").isdigit():
+                return int(directives[name])
+        return ttl
+
+    def _store(self, key, entry):
+        self._drop(key)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.counters["stored"] += 1
+        while self.bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate(self, prefix):
+        # Called after the gateway forwards a write, so its own writes are
+        # visible on the next read; other writers are covered by the TTLs
+        stale = [key for key in self._entries if key[1].startswith(prefix)]
+        for key in stale:
+            self._drop(key)
+        self.counters["invalidations"] += len(stale)
+
+    def _reply(self, request, entry, outcome):
+        headers = list(entry.headers)
+        headers.append((b"x-cache", outcome.encode()))
+        if outcome in ("HIT", "COALESCED"):
+            headers.append((b"age", str(int(entry.age())).encode()))
+        if_none_match = request.headers.get("if-none-match")
+        if entry.status_code == 200 and entry.etag and if_none_match and etag_matches(if_none_match, entry.etag):
+            self.counters["not_modified"] += 1
+            kept = {b"etag", b"cache-control", b"vary", b"expires", b"x-cache", b"age"}
+            response = Response(status_code=304)
+            response.raw_headers = [(k, v) for k, v in headers if k in kept]
+            return response
+        response = Response(content=entry.body, status_code=entry.status_code)
+        response.raw_headers = headers + [(b"content-length", str(len(entry.body)).encode())]
+        return response
+
+    def stats(self):
+        served = self.counters["hits"] + self.counters["coalesced"] + self.counters["misses"] + self.counters["revalidated"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round((self.counters["hits"] + self.counters["coalesced"]) / served, 3) if served else None,
+            **self.counters,
+        }
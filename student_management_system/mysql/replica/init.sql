@@ -0,0 +1,12 @@
+-- Runs once, on the replica's first start
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'qwertyuiop_09',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;
+-- Nothing but replication may write here; persisted so it survives the
+-- entrypoint's restart
+SET PERSIST super_read_only = ON;
@@ -13,17 +13,45 @@ TORTOISE_ORM = {
                 "user": os.getenv("DB_USER", "root"),
                 "password": os.getenv("DB_PASSWORD", "your_password"),
                 "database": os.getenv("DB_NAME", "student_management"),
+                # aiomysql pool; size maxsize for the expected concurrent queries
+                # per worker, and recycle connections before MySQL's wait_timeout
+                "minsize": int(os.getenv("DB_POOL_MIN", "1")),
+                "maxsize": int(os.getenv("DB_POOL_MAX", "10")),
+                "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
             }
         }
     },
     "apps": {
         "models": {
-            "models": ["db.models.students", "aerich.models"],
+            "models": ["db.models.students", "db.models.documents", "db.models.review_jobs", "aerich.models"],
             "default_connection": "default",
         }
     }
 }
 
+# Optional read replica: read-only queries go to it through db.routing while it
+# keeps up; anything not set falls back to the primary's value
+if os.getenv("DB_REPLICA_HOST"):
+    primary = TORTOISE_ORM["connections"]["default"]["credentials"]
+    TORTOISE_ORM["connections"]["replica"] = {
+        "engine": "tortoise.backends.mysql",
+        "credentials": {
+            **primary,
+            "host": os.getenv("DB_REPLICA_HOST"),
+            "port": int(os.getenv("DB_REPLICA_PORT", str(primary["port"]))),
+            "user": os.getenv("DB_REPLICA_USER", primary["user"]),
+            "password": os.getenv("DB_REPLICA_PASSWORD", primary["password"]),
+            "database": os.getenv("DB_REPLICA_NAME", primary["database"]),
+        },
+    }
+    TORTOISE_ORM["routers"] = ["db.routing.ReplicaRouter"]
+
+# A database URL (e.g. sqlite:///tmp/students.db) replaces the MySQL settings,
+# for running the service or the benchmarks without MySQL
+if os.getenv("DB_URL"):
+    TORTOISE_ORM["connections"]["default"] = os.getenv("DB_URL")
+
 async def init_db():
     await Tortoise.init(config=TORTOISE_ORM)
     await Tortoise.generate_schemas()
\ No newline at end of file
@@ -0,0 +1,47 @@
+# generate_schemas only creates indexes together with a new table, so indexes
+# added to a model later are created here on startup when missing (MySQL only;
+# other databases are expected to be created fresh).
+
+
+def _is_mysql(db):
+    return db.capabilities.dialect == "mysql"
+
+
+async def existing_indexes(db, table):
+    # {index name: (column, ...)} in index order
+    _, rows = await db.execute_query(
+        "SELECT index_name, column_name FROM information_schema.statistics"
+        " WHERE table_schema = DATABASE() AND table_name = %s ORDER BY index_name, seq_in_index",
+        [table],
+    )
+    indexes = {}
+    for row in rows:
+        # MySQL 8 reports information_schema columns in upper case
+        row = {key.lower(): value for key, value in row.items()}
+        indexes[row["index_name"]] = indexes.get(row["index_name"], ()) + (row["column_name"],)
+    return indexes
+
+
+async def ensure_index(db, table, columns, name=None, kind=""):
+    # `kind` is "" for a plain index or e.g. "FULLTEXT"
+    if not _is_mysql(db):
+        return False
+    columns = tuple(columns)
+    if columns in (await existing_indexes(db, table)).values():
+        return False
+    name = name or f"idx_{table}_{'_'.join(columns)}"[:64]
+    columns_sql = ", ".join(f"`{column}`" for column in columns)
+    kind = f"{kind} " if kind else ""
+    await db.execute_script(f"ALTER TABLE `{table}` ADD {kind}INDEX `{name}` ({columns_sql})")
+    return True
+
+
+async def ensure_model_indexes(*models):
+    # Creates the composite indexes declared in each model's Meta.indexes
+    for model in models:
+        db = model._meta.db
+        table = model._meta.db_table
+        for fields in model._meta.indexes:
+            if isinstance(fields, (tuple, list)):
+                columns = [model._meta.fields_db_projection[field] for field in fields]
+                await ensure_index(db, table, columns)
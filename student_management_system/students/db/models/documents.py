@@ -0,0 +1,19 @@
+from tortoise import fields, models
+
+
+class Document(models.Model):
+    id = fields.IntField(pk=True)
+    student = fields.ForeignKeyField("models.Student", related_name="documents", on_delete=fields.CASCADE)
+    title = fields.CharField(max_length=255)
+    # Files are stored once per content hash, so several rows may share a path
+    file_path = fields.TextField()
+    sha256 = fields.CharField(max_length=64, index=True)
+    size = fields.BigIntField()
+    content_type = fields.CharField(max_length=50)
+    upload_date = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "documents"
+
+    def __str__(self):
+        return self.title
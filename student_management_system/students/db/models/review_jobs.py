@@ -0,0 +1,36 @@
+from enum import Enum
+
+from tortoise import fields, models
+
+from db.models.students import RegistrationStatus
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ReviewJob(models.Model):
+    # Outbox row for an admin's bulk status change; the worker in
+    # services/review_queue.py picks it up
+    id = fields.IntField(pk=True)
+    idempotency_key = fields.CharField(max_length=64, unique=True, null=True)
+    # sha256 of the request, to tell a retry from a different request reusing the key
+    request_hash = fields.CharField(max_length=64)
+    target_status = fields.CharEnumField(RegistrationStatus)
+    student_ids = fields.JSONField()
+    status = fields.CharEnumField(JobStatus, default=JobStatus.QUEUED)
+    attempts = fields.IntField(default=0)
+    processed = fields.IntField(default=0)  # ids handled so far
+    changed = fields.IntField(default=0)  # students whose status actually changed
+    error = fields.TextField(null=True)
+    available_at = fields.DatetimeField()  # not picked up before this (retry backoff)
+    locked_until = fields.DatetimeField(null=True)  # lease of the worker running it
+    created_at = fields.DatetimeField(auto_now_add=True)
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "review_jobs"
+        indexes = (("status", "available_at"),)
@@ -21,6 +21,12 @@ class Student(models.Model):
 
     class Meta:
         table = "students"
+        indexes = (
+            # Listing filtered by department (and status), paged by id
+            ("department", "registration_status", "id"),
+            # Admin review: students in a given status, oldest first
+            ("registration_status", "created_at"),
+        )
     def __str__(self):
         return f"{self.name} ({self.registration_no})"
 
@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from tortoise import connections
+
+PRIMARY = "default"
+REPLICA = "replica"
+REPLICA_ENABLED = bool(os.getenv("DB_REPLICA_HOST"))
+# A replica further behind than this (seconds) is taken out of rotation
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "2"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1"))
+# "status" reads SHOW REPLICA STATUS; "none" trusts the replica, for two plain
+# databases standing in for a primary/replica pair
+REPLICA_LAG_CHECK = os.getenv("DB_REPLICA_LAG_CHECK", "status")
+# After a write, the same client reads from the primary for this many seconds
+READ_YOUR_WRITES = float(os.getenv("DB_READ_YOUR_WRITES", "5"))
+MAX_TRACKED_CLIENTS = 10000
+
+logger = logging.getLogger("students.replica")
+
+_client = contextvars.ContextVar("db_client", default=None)
+
+
+class ReplicaMonitor:
+    def __init__(self, max_lag=REPLICA_MAX_LAG, interval=REPLICA_CHECK_INTERVAL, window=READ_YOUR_WRITES):
+        self.max_lag = max_lag
+        self.interval = interval
+        self.window = window
+        self.available = False
+        self.lag = None
+        self._writers = OrderedDict()  # client -> primary-only until (monotonic)
+        self._task = None
+        self.counters = dict.fromkeys(
+            ("replica_reads", "primary_reads", "sticky_reads", "writes", "taken_out", "put_back"), 0)
+
+    def wrote(self, client):
+        self.counters["writes"] += 1
+        if client is None:
+            return
+        self._writers[client] = time.monotonic() + self.window
+        self._writers.move_to_end(client)
+        while len(self._writers) > MAX_TRACKED_CLIENTS:
+            self._writers.popitem(last=False)
+
+    def recently_wrote(self, client):
+        until = self._writers.get(client)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._writers[client]
+            return False
+        return True
+
+    async def measure_lag(self):
+        # Seconds the replica is behind, or None when it isn't replicating
+        if REPLICA_LAG_CHECK == "none":
+            await connections.get(REPLICA).execute_query("SELECT 1")
+            return 0.0
+        db = connections.get(REPLICA)
+        try:
+            _, rows = await db.execute_query("SHOW REPLICA STATUS")
+        except Exception:
+            _, rows = await db.execute_query("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+        if not rows:
+            return None
+        row = rows[0]
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+
+    async def check(self):
+        try:
+            self.lag = await self.measure_lag()
+        except Exception as exc:
+            logger.debug("replica check failed: %s", exc)
+            self.lag = None
+        available = self.lag is not None and self.lag <= self.max_lag
+        if available != self.available:
+            self.counters["put_back" if available else "taken_out"] += 1
+            logger.warning("replica %s (lag: %s s)", "back in rotation" if available else "out of rotation", self.lag)
+        self.available = available
+
+    async def _loop(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        await self.check()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {"enabled": REPLICA_ENABLED, "available": self.available, "lag_s": self.lag,
+                "max_lag_s": self.max_lag, **self.counters}
+
+
+replica_monitor = ReplicaMonitor()
+
+
+class ReplicaRouter:
+    # Listed under "routers" in TORTOISE_ORM when DB_REPLICA_HOST is set.
+    # Returning None means the model's default connection (the primary).
+    def db_for_read(self, model):
+        if not replica_monitor.available:
+            replica_monitor.counters["primary_reads"] += 1
+            return None
+        if replica_monitor.recently_wrote(_client.get()):
+            replica_monitor.counters["sticky_reads"] += 1
+            return None
+        replica_monitor.counters["replica_reads"] += 1
+        return REPLICA
+
+    def db_for_write(self, model):
+        replica_monitor.wrote(_client.get())
+        return None
+
+
+def primary_connection():
+    return connections.get(PRIMARY)
+
+
+def client_key(scope):
+    # Who is asking: their credentials if any, else the address the gateway
+    # saw (X-Forwarded-For), else the socket peer
+    headers = dict(scope.get("headers") or [])
+    if b"authorization" in headers:
+        return hashlib.sha1(headers[b"authorization"]).hexdigest()
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded:
+        return forwarded.split(b",")[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class ClientAffinityMiddleware:
+    # Tags every query made while serving a request with the requesting
+    # client, for the read-your-writes window
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _client.set(client_key(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _client.reset(token)
@@ -1,9 +1,49 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from tortoise.contrib.fastapi import register_tortoise
 from db.config import TORTOISE_ORM
-from routers import students
+from db.indexes import ensure_model_indexes
+from db.models.students import Student
+from db.routing import REPLICA_ENABLED, ClientAffinityMiddleware, replica_monitor
+from routers import documents, reviews, students
+from services.passwords import HashingBusy, hasher
+from services.review_queue import review_queue
+from services.query_stats import QueryTrackingMiddleware, install_query_instrumentation, query_stats
+from services.search import ensure_search_indexes
+from services.status_events import status_events
+from services.student_cache import student_cache
+from shared.observability import instrument_redis, query_listener, setup as setup_observability
+from shared.serialization import MessagePackMiddleware
 
-app = FastAPI(title="Student Management System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    install_query_instrumentation()
+    await ensure_model_indexes(Student)
+    await ensure_search_indexes()
+    if REPLICA_ENABLED:
+        await replica_monitor.start()
+    hasher.start()
+    await student_cache.start()
+    await status_events.start(student_cache.redis)
+    await review_queue.start()
+    try:
+        yield
+    finally:
+        await review_queue.stop()
+        await status_events.stop()
+        await student_cache.stop()
+        hasher.stop()
+        await replica_monitor.stop()
+
+app = FastAPI(title="Student Management System", lifespan=lifespan)
+# JSON as FastAPI encodes it, or MessagePack for callers that send Accept: application/msgpack
+app.add_middleware(MessagePackMiddleware)
+app.add_middleware(QueryTrackingMiddleware)
+app.add_middleware(ClientAffinityMiddleware)
+setup_observability(app, "students")
+instrument_redis()
+query_stats.listeners.append(query_listener("students"))
 
 # Register Tortoise ORM
 register_tortoise(
@@ -13,9 +53,25 @@ register_tortoise(
     add_exception_handlers=True,
 )
 
+@app.exception_handler(HashingBusy)
+async def hashing_busy_handler(request: Request, exc: HashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password operations in progress, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 # Include routers
 app.include_router(students.router, prefix="/api/students", tags=["students"])
+app.include_router(documents.router, prefix="/api/students", tags=["documents"])
+app.include_router(reviews.router, prefix="/api/students", tags=["reviews"])
 
 @app.get("/")
 async def root():
-    return {"message": "Student Management System API"}
\ No newline at end of file
+    return {"message": "Student Management System API"}
+
+@app.get("/internal/stats")
+async def stats():
+    return {"password_hasher": hasher.stats(), "student_cache": student_cache.stats(),
+            "queries": query_stats.stats(), "replica": replica_monitor.stats(),
+            "review_queue": await review_queue.stats(), "status_events": status_events.stats()}
\ No newline at end of file
@@ -0,0 +1,82 @@
+import os
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from db.models.documents import Document
+from db.models.students import RegistrationStatus, Student
+from services.document_storage import EXTENSIONS, UploadError, receive_upload
+
+router = APIRouter()
+
+# FR6: only students whose registration went through may upload
+UPLOAD_ALLOWED = {RegistrationStatus.TEMPORARY, RegistrationStatus.COMPLETE}
+DOCUMENT_FIELDS = ("id", "title", "sha256", "size", "content_type", "upload_date")
+
+
+class DocumentResponse(BaseModel):
+    id: int
+    title: str
+    sha256: str
+    size: int
+    content_type: str
+    upload_date: datetime
+
+    class Config:
+        orm_mode = True
+
+
+async def get_student_or_404(student_id: int):
+    student = await Student.get_or_none(id=student_id)
+    if student is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+    return student
+
+
+@router.post("/{student_id}/documents", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
+async def upload_document(student_id: int, request: Request):
+    # multipart/form-data with a "file" part and an optional "title" field.
+    # The body is parsed as it streams in and written to disk chunk by chunk.
+    student = await get_student_or_404(student_id)
+    if student.registration_status not in UPLOAD_ALLOWED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Documents can be uploaded once registration is temporary or complete",
+        )
+    try:
+        fields, stored = await receive_upload(request)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    title = fields.get("title") or os.path.basename(stored.filename) or stored.sha256[:12]
+    return await Document.create(
+        student=student, title=title[:255], file_path=stored.path, sha256=stored.sha256,
+        size=stored.size, content_type=stored.content_type,
+    )
+
+
+@router.get("/{student_id}/documents", response_model=List[DocumentResponse])
+async def list_documents(student_id: int):
+    await get_student_or_404(student_id)
+    return await Document.filter(student_id=student_id).order_by("id").values(*DOCUMENT_FIELDS)
+
+
+@router.get("/{student_id}/documents/{document_id}")
+async def download_document(student_id: int, document_id: int):
+    # FileResponse streams from disk (or hands the path to the server when it
+    # supports zero-copy sends) and answers Range requests
+    document = await Document.get_or_none(id=document_id, student_id=student_id)
+    if document is None or not os.path.exists(document.file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    filename = document.title
+    extension = EXTENSIONS.get(document.content_type, "")
+    if not filename.lower().endswith(extension):
+        filename += extension
+    return FileResponse(
+        document.file_path,
+        media_type=document.content_type,
+        filename=filename,
+        headers={"ETag": f'"{document.sha256}"', "Cache-Control": "private, max-age=86400"},
+    )
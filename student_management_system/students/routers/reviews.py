@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from pydantic import BaseModel, Field
+
+from db.models.review_jobs import ReviewJob
+from db.models.students import RegistrationStatus
+from services.review_queue import IdempotencyConflict, review_queue
+
+router = APIRouter()
+
+MAX_REVIEW_IDS = 100000
+
+
+class ReviewRequest(BaseModel):
+    student_ids: List[int] = Field(..., min_items=1, max_items=MAX_REVIEW_IDS)
+    status: RegistrationStatus
+
+
+class ReviewJobResponse(BaseModel):
+    id: int
+    status: str
+    target_status: RegistrationStatus
+    total: int
+    processed: int
+    changed: int
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+def job_response(job):
+    return ReviewJobResponse(
+        id=job.id, status=job.status.value, target_status=job.target_status, total=len(job.student_ids),
+        processed=job.processed, changed=job.changed, attempts=job.attempts, error=job.error,
+        created_at=job.created_at, finished_at=job.finished_at,
+    )
+
+
+@router.post("/admin/reviews", response_model=ReviewJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_review(
+    review: ReviewRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=64),
+):
+    # FR2: set many students' registration status at once. The change is
+    # queued and applied in the background; poll the returned job for progress.
+    try:
+        job, created = await review_queue.enqueue(review.student_ids, review.status, idempotency_key)
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = f"/api/students/admin/reviews/{job.id}"
+    return job_response(job)
+
+
+@router.get("/admin/reviews/{job_id}", response_model=ReviewJobResponse)
+async def get_review(job_id: int):
+    job = await ReviewJob.get_or_none(id=job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review job not found")
+    return job_response(job)
@@ -1,12 +1,31 @@
-from fastapi import APIRouter, HTTPException, status
-from tortoise.exceptions import DoesNotExist
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+import asyncio
 from pydantic import BaseModel, EmailStr
 from db.models.students import Student, RegistrationStatus
+from services.bulk_registration import (
+    BULK_BATCH_SIZE, MAX_BULK_BATCH_SIZE, csv_rows, json_array_rows, ndjson_rows, register_in_batches,
+)
+from services.passwords import hasher, needs_rehash
+from services.query_stats import allow_repeated_queries
+from services.search import search_students
+from services.status_events import status_events
+from services.student_cache import student_cache
+from shared.serialization import dumps_json
 from tortoise.contrib.pydantic import pydantic_model_creator
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+# Ranked results can't use a keyset cursor, so paging is by offset up to this depth
+MAX_SEARCH_DEPTH = 1000
+# Columns returned by the listing endpoints, read with .values() so rows never
+# become full model instances
+LISTING_FIELDS = ("id", "name", "email", "department", "registration_no", "registration_status", "phone")
+
 
 # Create Pydantic model for Student
 StudentPydantic = pydantic_model_creator(Student, name="Student")
@@ -19,51 +38,206 @@ class StudentCreate(BaseModel):
     registration_no: Optional[str]  = None
     phone: Optional[str]  = None
 
+class StudentLogin(BaseModel):
+    email: EmailStr
+    password: str
+
 class StudentResponse(BaseModel):
     id: int
     name: str
     email: str
     department: str
-    registration_no: str
+    registration_no: Optional[str] = None
     registration_status: RegistrationStatus
     phone: Optional[str]  = None
 
     class Config:
         orm_mode = True
 
+class StudentSearchResult(StudentResponse):
+    score: float
+
+class StudentRegistered(BaseModel):
+    status: str
+    data: StudentResponse
+
 
 
-@router.post("/v1_0/register_student", status_code=status.HTTP_201_CREATED)
+@router.post("/v1_0/register_student", response_model=StudentRegistered, status_code=status.HTTP_201_CREATED)
 async def register_student(student: StudentCreate):
-    # Here you would add password hashing logic
-    student_obj = await Student.create(
+    # response_model keeps password_hash out of the reply
+    student_obj = await build_student(student)
+    await student_obj.save()
+    return {
+        "status": "success",
+        "data": student_obj
+    }
+
+
+async def build_student(student: StudentCreate, wait_for_hasher: bool = False):
+    return Student(
         name=student.name,
         email=student.email,
-        password_hash=student.password,  # Remember to hash this!
+        password_hash=await hasher.hash(student.password, wait=wait_for_hasher),
         department=student.department,
         registration_no=student.registration_no,
         phone=student.phone
     )
-    #return await StudentResponse.from_tortoise_orm(student_obj)
-    return {
-        "status": "success",
-        "data": student_obj
-    }
 
 
+async def build_student_in_bulk(student: StudentCreate):
+    # Bulk uploads wait for the hashing pool rather than failing with 503
+    return await build_student(student, wait_for_hasher=True)
+
+
+# Verified when the email is unknown so both cases take about as long
+_DUMMY_HASH = None
+
+
+@router.post("/v1_0/login", response_model=StudentResponse)
+async def login(credentials: StudentLogin):
+    global _DUMMY_HASH
+    student = await Student.get_or_none(email=credentials.email)
+    if student is None:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = await hasher.hash("not-a-real-password")
+        await hasher.verify(credentials.password, _DUMMY_HASH)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+    if not await hasher.verify(credentials.password, student.password_hash):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+    if needs_rehash(student.password_hash):
+        # Cost parameters changed (or the row predates hashing): upgrade now
+        # that the plain password is at hand
+        student.password_hash = await hasher.hash(credentials.password)
+        await Student.filter(id=student.id).update(password_hash=student.password_hash)
+    return student
+
+
+@router.post("/v1_0/register_students", status_code=status.HTTP_200_OK)
+async def register_students(request: Request, batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE)):
+    # Body is a JSON array, or streamed NDJSON (application/x-ndjson) or CSV
+    # (text/csv, header row first). Rows are inserted in batches; rejected rows
+    # are listed in the response without stopping the rest of the upload.
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/ndjson"):
+        rows = ndjson_rows(request)
+    elif content_type == "text/csv":
+        rows = csv_rows(request)
+    elif content_type == "application/json":
+        rows = json_array_rows(request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv)"
+        )
+    report = await register_in_batches(rows, StudentCreate, build_student_in_bulk, batch_size,
+                                       build_concurrency=hasher.workers)
+    return report.as_dict()
+
+
+
+
+
+def filter_students(department: Optional[str], registration_status: Optional[RegistrationStatus]):
+    # Filters become part of the SQL WHERE clause
+    query = Student.all()
+    if department is not None:
+        query = query.filter(department=department)
+    if registration_status is not None:
+        query = query.filter(registration_status=registration_status)
+    return query
+
+
+@router.get("/", response_model=List[StudentResponse])
+async def get_students(
+    response: Response,
+    after_id: Optional[int] = Query(None, description="Cursor: return students with an id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    department: Optional[str] = None,
+    registration_status: Optional[RegistrationStatus] = None,
+):
+    query = filter_students(department, registration_status)
+    if after_id is not None:
+        query = query.filter(id__gt=after_id)
+    # Fetch one extra row to know whether there is a next page
+    rows = await query.order_by("id").limit(limit + 1).values(*LISTING_FIELDS)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return rows
 
 
+@router.get("/stream")
+async def stream_students(
+    department: Optional[str] = None,
+    registration_status: Optional[RegistrationStatus] = None,
+    chunk_size: int = Query(STREAM_CHUNK_SIZE, ge=1, le=10 * STREAM_CHUNK_SIZE),
+):
+    # Every student as NDJSON (one JSON object per line), read from the
+    # database in keyset-paginated chunks so memory stays flat
+    allow_repeated_queries()
+    async def rows():
+        last_id = 0
+        while True:
+            chunk = await (filter_students(department, registration_status)
+                           .filter(id__gt=last_id).order_by("id").limit(chunk_size).values(*LISTING_FIELDS))
+            if not chunk:
+                return
+            yield b"".join(dumps_json(row) + b"\n" for row in chunk)
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1]["id"]
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+@router.get("/search", response_model=List[StudentSearchResult])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_DEPTH),
+):
+    # Keyword search over name, department, registration number and document
+    # titles, best match first
+    results, has_more = await search_students(q.strip(), LISTING_FIELDS, limit, offset)
+    if has_more and offset + limit <= MAX_SEARCH_DEPTH:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return results
+
+
+@router.get("/events")
+async def status_changes(student_id: Optional[int] = None, keepalive: float = Query(15, ge=1, le=300)):
+    # Server-sent events: one "status" event per registration status change,
+    # optionally only for one student
+    queue = status_events.subscribe()
+
+    async def events():
+        try:
+            yield b": connected\n\n"
+            while True:
+                try:
+                    batch = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if batch is None:
+                    return
+                for event in batch:
+                    if student_id is None or event["student_id"] == student_id:
+                        yield b"event: status\ndata: " + dumps_json(event) + b"\n\n"
+        finally:
+            status_events.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 
 @router.get("/{student_id}", response_model=StudentResponse)
 async def get_student(student_id: int):
-    try:
-        return await Student.get(id=student_id)
-    except DoesNotExist:
+    student = await student_cache.get(student_id)
+    if student is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student not found"
         )
-
-@router.get("/", response_model=List[StudentResponse])
-async def get_students():
-    return await Student.all()
\ No newline at end of file
+    return student
@@ -0,0 +1,216 @@
+import asyncio
+import collections
+import csv
+import json
+import os
+
+from pydantic import ValidationError
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from db.models.students import Student
+from db.routing import PRIMARY
+from services.student_cache import student_cache
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+MAX_BULK_BATCH_SIZE = 5000
+
+
+class BulkReport:
+    def __init__(self):
+        self.created = 0
+        self.conflicts = 0
+        self.invalid = 0
+        self.errors = []  # one entry per rejected row, rows are numbered from 1
+
+    def reject(self, row, reason, **details):
+        if reason == "invalid":
+            self.invalid += 1
+        else:
+            self.conflicts += 1
+        self.errors.append({"row": row, "reason": reason, **details})
+
+    def as_dict(self):
+        return {
+            "status": "success",
+            "created": self.created,
+            "conflicts": self.conflicts,
+            "invalid": self.invalid,
+            # Batches finish out of input order, so sort by row for the reader
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+
+async def iter_lines(request):
+    # Splits the streamed request body into lines (bytes) without buffering
+    # all of it; each line is decoded on its own, so bad UTF-8 spoils one row
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+
+async def ndjson_rows(request):
+    number = 0
+    async for line in iter_lines(request):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:  # includes UnicodeDecodeError
+            yield number, exc
+
+
+class _LineQueue(collections.deque):
+    # Source for a long-lived csv.reader: yields the lines queued so far
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self:
+            raise StopIteration
+        return self.popleft()
+
+
+async def csv_records(request):
+    # Groups lines into whole CSV records, decoded: a quoted field may span
+    # lines, so a record ends at the first line where its quotes balance.
+    # A record that isn't valid UTF-8 comes out as the UnicodeDecodeError.
+    record, quotes = [], 0
+    async for line in iter_lines(request):
+        record.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield _decode_record(record)
+            record, quotes = [], 0
+    if record:
+        yield _decode_record(record)  # an unterminated quote; the reader makes what it can of it
+
+
+def _decode_record(record):
+    try:
+        return [line.decode("utf-8") + "\n" for line in record]
+    except UnicodeDecodeError as exc:
+        return exc
+
+
+async def csv_rows(request):
+    # One csv.reader parses the whole upload, fed a record at a time
+    lines = _LineQueue()
+    reader = csv.reader(lines)
+    header = None
+    number = 0
+    async for record in csv_records(request):
+        if isinstance(record, Exception):
+            number += 1
+            yield number, record
+            continue
+        lines.extend(record)
+        try:
+            values = next(reader)
+        except csv.Error as exc:
+            lines.clear()
+            number += 1
+            yield number, exc
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        number += 1
+        # Empty cells mean "not given" for the optional columns
+        yield number, {key: value or None for key, value in zip(header, values)}
+
+
+async def json_array_rows(request):
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as exc:
+        rows = exc
+    if not isinstance(rows, list):
+        yield 1, ValueError("expected a JSON array of students")
+        return
+    for number, row in enumerate(rows, start=1):
+        yield number, row
+
+
+async def register_in_batches(rows, schema, build, batch_size=BULK_BATCH_SIZE, build_concurrency=1):
+    # Validates every row with `schema`, turns valid ones into Student objects
+    # with `build` (up to `build_concurrency` at once) and inserts them
+    # `batch_size` at a time. Duplicate emails and registration numbers are
+    # reported per row instead of failing the upload.
+    report = BulkReport()
+    seen_emails, seen_reg_nos = set(), set()
+    batch = []
+    async for number, raw in rows:
+        if isinstance(raw, Exception):
+            report.reject(number, "invalid", errors=[{"msg": str(raw)}])
+            continue
+        if not isinstance(raw, dict):
+            report.reject(number, "invalid", errors=[{"msg": "expected a JSON object"}])
+            continue
+        try:
+            student = schema(**raw)
+        except ValidationError as exc:
+            report.reject(number, "invalid", errors=[
+                {"loc": list(error["loc"]), "msg": error["msg"]} for error in exc.errors()])
+            continue
+        if student.email in seen_emails:
+            report.reject(number, "duplicate_email", email=student.email)
+            continue
+        if student.registration_no and student.registration_no in seen_reg_nos:
+            report.reject(number, "duplicate_registration_no", registration_no=student.registration_no)
+            continue
+        seen_emails.add(student.email)
+        if student.registration_no:
+            seen_reg_nos.add(student.registration_no)
+        batch.append((number, student))
+        if len(batch) >= batch_size:
+            await _insert_batch(batch, build, build_concurrency, report)
+            batch = []
+    if batch:
+        await _insert_batch(batch, build, build_concurrency, report)
+    return report
+
+
+async def _insert_batch(batch, build, build_concurrency, report):
+    # One query per column to find rows that already exist, then a single
+    # multi-row INSERT for the rest
+    emails = [student.email for _, student in batch]
+    reg_nos = [student.registration_no for _, student in batch if student.registration_no]
+    taken_emails = set(await Student.filter(email__in=emails).values_list("email", flat=True))
+    taken_reg_nos = set(await Student.filter(registration_no__in=reg_nos).values_list("registration_no", flat=True)) \
+        if reg_nos else set()
+    fresh = []
+    for number, student in batch:
+        if student.email in taken_emails:
+            report.reject(number, "duplicate_email", email=student.email)
+        elif student.registration_no in taken_reg_nos:
+            report.reject(number, "duplicate_registration_no", registration_no=student.registration_no)
+        else:
+            fresh.append((number, student))
+    if not fresh:
+        return
+    objects = []
+    for start in range(0, len(fresh), build_concurrency):
+        objects += await asyncio.gather(*(build(student) for _, student in fresh[start:start + build_concurrency]))
+    try:
+        async with in_transaction(PRIMARY):
+            await Student.bulk_create(objects)
+        report.created += len(objects)
+        await student_cache.forget_missing()
+    except IntegrityError:
+        # Someone inserted a conflicting row since the check above; fall back
+        # to row-by-row inserts so only the conflicting rows are rejected
+        for (number, student), obj in zip(fresh, objects):
+            try:
+                await obj.save()
+                report.created += 1
+            except IntegrityError:
+                report.reject(number, "duplicate", email=student.email, registration_no=student.registration_no)
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import os
+import uuid
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/uploads")
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(20 * 2 ** 20)))
+# Bytes gathered before each disk write; the write and the hash update run in
+# a worker thread so the event loop never waits on the disk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(2 ** 20)))
+MAX_FIELD_SIZE = 1024  # non-file form fields such as "title"
+
+# Leading bytes of each accepted type; the client's Content-Type is ignored
+SIGNATURES = (
+    (b"%PDF-", "application/pdf", ".pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+)
+SNIFF_SIZE = max(len(magic) for magic, _, _ in SIGNATURES)
+EXTENSIONS = {content_type: extension for _, content_type, extension in SIGNATURES}
+
+
+class UploadError(Exception):
+    status_code = 400
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+
+class UnsupportedFileType(UploadError):
+    status_code = 415
+
+
+class StoredFile:
+    def __init__(self, filename, sha256, size, content_type, path, deduplicated):
+        self.filename = filename
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.path = path
+        self.deduplicated = deduplicated
+
+
+def sniff(head):
+    for magic, content_type, _ in SIGNATURES:
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+def path_for(sha256):
+    return os.path.join(UPLOAD_DIR, sha256[:2], sha256)
+
+
+class _Events:
+    # python-multipart calls these synchronously from parser.write(); they are
+    # queued here and handled by the async loop in receive_upload()
+    def __init__(self):
+        self.queue = []
+        self._field = self._value = b""
+        self._headers = {}
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+        self._field = self._value = b""
+
+    def _header_field(self, data, start, end):
+        self._field += data[start:end]
+
+    def _header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        self.queue.append(("begin", name, filename.decode("utf-8", "replace") if filename is not None else None))
+
+    def _part_data(self, data, start, end):
+        self.queue.append(("data", bytes(data[start:end])))
+
+    def _part_end(self):
+        self.queue.append(("end",))
+
+
+class _Spool:
+    # The file part's bytes on their way to a temporary file under UPLOAD_DIR
+    def __init__(self, filename):
+        self.filename = filename
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.content_type = None
+        self.pending = []
+        self.pending_size = 0
+        os.makedirs(os.path.join(UPLOAD_DIR, "tmp"), exist_ok=True)
+        self.tmp_path = os.path.join(UPLOAD_DIR, "tmp", uuid.uuid4().hex)
+        self.fh = open(self.tmp_path, "wb")
+
+    def _write(self, data):
+        self.digest.update(data)
+        self.fh.write(data)
+
+    async def add(self, data, max_size):
+        self.size += len(data)
+        if self.size > max_size:
+            raise UploadTooLarge(f"File is larger than {max_size} bytes")
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.content_type is None and self.pending_size >= SNIFF_SIZE:
+            self._check_type()
+        if self.pending_size >= UPLOAD_CHUNK_SIZE:
+            await self.flush()
+
+    def _check_type(self):
+        self.content_type = sniff(b"".join(self.pending)[:SNIFF_SIZE])
+        if self.content_type is None:
+            raise UnsupportedFileType("Only PDF, JPG and PNG files are accepted")
+
+    async def flush(self):
+        if self.pending:
+            data = b"".join(self.pending)
+            self.pending, self.pending_size = [], 0
+            await asyncio.to_thread(self._write, data)
+
+    async def finish(self):
+        if self.content_type is None:
+            self._check_type()
+        await self.flush()
+        await asyncio.to_thread(self.fh.close)
+        sha256 = self.digest.hexdigest()
+        path = path_for(sha256)
+        deduplicated = await asyncio.to_thread(self._store, path)
+        return StoredFile(self.filename, sha256, self.size, self.content_type, path, deduplicated)
+
+    def _store(self, path):
+        # Identical content is kept once; later uploads reuse the stored file
+        if os.path.exists(path):
+            os.remove(self.tmp_path)
+            return True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.tmp_path, path)
+        return False
+
+    def discard(self):
+        self.fh.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+async def receive_upload(request, file_field="file", max_size=MAX_UPLOAD_SIZE):
+    # Parses a multipart/form-data body as it arrives and streams the
+    # `file_field` part to disk. Returns (form fields, StoredFile).
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadError("Expected a multipart/form-data body")
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_size + 64 * 1024:
+        # Refuse before reading anything; the margin covers the multipart framing
+        raise UploadTooLarge(f"File is larger than {max_size} bytes")
+
+    events = _Events()
+    parser = MultipartParser(options[b"boundary"], events.callbacks())
+    fields, spool, current, stored = {}, None, None, None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in events.queue:
+                if event[0] == "begin":
+                    _, name, filename = event
+                    if name == file_field and filename is not None:
+                        if spool is not None:
+                            raise UploadError("Only one file can be uploaded at a time")
+                        spool = current = _Spool(filename)
+                    else:
+                        current = name
+                        fields[name] = b""
+                elif event[0] == "data":
+                    if isinstance(current, _Spool):
+                        await current.add(event[1], max_size)
+                    elif current is not None:
+                        fields[current] += event[1]
+                        if len(fields[current]) > MAX_FIELD_SIZE:
+                            raise UploadError(f"Form field {current!r} is too long")
+                else:
+                    current = None
+            events.queue.clear()
+        parser.finalize()
+        if spool is None:
+            raise UploadError(f"Missing file field {file_field!r}")
+        stored = await spool.finish()
+    finally:
+        if spool is not None and stored is None:
+            spool.discard()
+    return {name: value.decode("utf-8", "replace") for name, value in fields.items()}, stored
@@ -0,0 +1,25 @@
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        self.total_ms += ms
+        for index, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]
+        observed = sum(self.counts)
+        return {
+            "count": observed,
+            "avg_ms": round(self.total_ms / observed, 3) if observed else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
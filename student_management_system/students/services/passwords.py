@@ -0,0 +1,107 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# scrypt cost parameters; raising them makes existing hashes get upgraded on
+# the next successful login
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# How many hashes may wait for a free worker before new ones are turned away
+HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")  # "process" or "thread"
+
+SCHEME = "scrypt"
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * (n + p + 2), dklen=32)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+# The two functions below run inside the worker pool, so they must stay
+# top-level and only take picklable arguments
+def hash_password_sync(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = os.urandom(16)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def verify_password_sync(password, stored):
+    if not stored.startswith(SCHEME + "$"):
+        # Rows registered before hashing was added hold the plain password
+        return hmac.compare_digest(password.encode(), stored.encode())
+    _, n, r, p, salt, expected = stored.split("$")
+    actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(actual, base64.b64decode(expected))
+
+
+def needs_rehash(stored):
+    if not stored.startswith(SCHEME + "$"):
+        return True
+    _, n, r, p, _, _ = stored.split("$")
+    return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+class PasswordHasher:
+    # Runs key derivation in a dedicated worker pool so it never blocks the
+    # event loop. At most workers + queue_size hashes are accepted at once;
+    # beyond that HashingBusy is raised right away instead of queueing forever.
+
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE_SIZE, executor=HASH_EXECUTOR):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.executor_kind = executor
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+        self._slots = None
+
+    def start(self):
+        pool = ProcessPoolExecutor if self.executor_kind == "process" else ThreadPoolExecutor
+        self._executor = pool(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.capacity)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args, wait=False):
+        # Interactive requests (wait=False) fail fast when the pool is full;
+        # background work like bulk uploads waits for a free slot instead
+        if self._executor is None:
+            self.start()
+        if not wait and self._slots.locked():
+            self.rejected += 1
+            raise HashingBusy()
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    async def hash(self, password, wait=False):
+        return await self._run(hash_password_sync, password, SCRYPT_N, SCRYPT_R, SCRYPT_P, wait=wait)
+
+    async def verify(self, password, stored):
+        return await self._run(verify_password_sync, password, stored)
+
+    def stats(self):
+        return {"workers": self.workers, "capacity": self.capacity,
+                "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+hasher = PasswordHasher()
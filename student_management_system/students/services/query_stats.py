@@ -0,0 +1,188 @@
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from tortoise import connections
+
+from services.metrics import LatencyHistogram
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# The same query shape run this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+MAX_FINGERPRINTS = 500
+QUERY_METHODS = ("execute_query", "execute_query_dict", "execute_insert", "execute_many")
+
+logger = logging.getLogger("students.queries")
+
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?|\$\d+)(?:\s*,\s*(?:%s|\?|\$\d+))*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+# Set while a query is being timed, so client methods that call each other
+# (MySQL's execute_query_dict -> execute_query) are only counted once
+_timing = contextvars.ContextVar("query_timing", default=False)
+_request = contextvars.ContextVar("query_request", default=None)
+
+
+def fingerprint(sql):
+    # Same query shape -> same fingerprint, whatever the values and IN() sizes
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _LITERAL.sub("?", sql)
+    return " ".join(sql.split())[:300]
+
+
+class QueryShape:
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / self.count, 3),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class RequestQueries:
+    # Queries issued while serving one request
+    def __init__(self):
+        self.route = None
+        self.shapes = Counter()
+        self.allow_repeats = False
+
+
+class QueryStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.shapes = {}
+        self.slow = 0
+        self.errors = 0
+        self.n_plus_one = Counter()  # route -> requests flagged
+        # Callables taking (sql, fingerprint, elapsed_ms, rows, error), e.g. tracing
+        self.listeners = []
+
+    def record(self, sql, elapsed_ms, rows, error=None):
+        shape = fingerprint(sql)
+        self.latency.observe(elapsed_ms)
+        if shape not in self.shapes and len(self.shapes) >= MAX_FINGERPRINTS:
+            shape = "(other)"
+        stats = self.shapes.setdefault(shape, QueryShape())
+        stats.count += 1
+        stats.rows += rows
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if error is not None:
+            self.errors += 1
+        if elapsed_ms >= SLOW_QUERY_MS:
+            self.slow += 1
+            logger.warning("slow query (%.1f ms, %d rows): %s", elapsed_ms, rows, sql[:1000])
+        current = _request.get()
+        if current is not None:
+            current.shapes[shape] += 1
+        for listener in self.listeners:
+            listener(sql, shape, elapsed_ms, rows, error)
+
+    def finish_request(self, current):
+        if current.allow_repeats or not current.shapes:
+            return
+        shape, count = current.shapes.most_common(1)[0]
+        if count >= N_PLUS_ONE_THRESHOLD:
+            self.n_plus_one[current.route] += 1
+            logger.warning("possible N+1 in %s: same query ran %d times: %s", current.route, count, shape)
+
+    def stats(self, top=10):
+        slowest = sorted(self.shapes.items(), key=lambda item: item[1].total_ms, reverse=True)[:top]
+        return {
+            "latency": self.latency.as_dict(),
+            "slow_queries": self.slow,
+            "errors": self.errors,
+            "n_plus_one": dict(self.n_plus_one),
+            "top_by_total_time": [{"query": shape, **stats.as_dict()} for shape, stats in slowest],
+        }
+
+
+query_stats = QueryStats()
+
+
+def _row_count(method, result, args):
+    if method == "execute_query":
+        rowcount, rows = result
+        return len(rows) or max(rowcount, 0)
+    if method == "execute_query_dict":
+        return len(result)
+    if method == "execute_many":
+        return len(args[1]) if len(args) > 1 else 0
+    return 1
+
+
+def _timed(method, fn):
+    async def wrapper(self, *args, **kwargs):
+        if _timing.get():
+            return await fn(self, *args, **kwargs)
+        token = _timing.set(True)
+        started = time.perf_counter()
+        try:
+            result = await fn(self, *args, **kwargs)
+        except Exception as exc:
+            query_stats.record(args[0], (time.perf_counter() - started) * 1000, 0, exc)
+            raise
+        finally:
+            _timing.reset(token)
+        query_stats.record(args[0], (time.perf_counter() - started) * 1000, _row_count(method, result, args))
+        return result
+
+    wrapper.timed = True
+    return wrapper
+
+
+def _patch(cls):
+    for method in QUERY_METHODS:
+        fn = getattr(cls, method)
+        if not getattr(fn, "timed", False):
+            setattr(cls, method, _timed(method, fn))
+    # e.g. the backend's TransactionWrapper, which overrides some of them
+    for subclass in cls.__subclasses__():
+        _patch(subclass)
+
+
+def install_query_instrumentation():
+    # Call once Tortoise is initialised
+    for connection in connections.all():
+        _patch(type(connection))
+
+
+class QueryTrackingMiddleware:
+    # Pure ASGI middleware, so queries run while a streaming response is being
+    # sent still count towards its request
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        current = RequestQueries()
+        token = _request.set(current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+            # The router has filled in the matched route by now; its template
+            # keeps ids out of the label
+            route = scope.get("route")
+            current.route = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+            query_stats.finish_request(current)
+
+
+def allow_repeated_queries():
+    # For endpoints that deliberately run one query per chunk, like streams
+    current = _request.get()
+    if current is not None:
+        current.allow_repeats = True
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+
+from db.models.review_jobs import JobStatus, ReviewJob
+from db.models.students import Student
+from db.routing import PRIMARY
+from services.status_events import status_events
+from services.student_cache import student_cache
+
+REVIEW_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", "1000"))
+REVIEW_MAX_ATTEMPTS = int(os.getenv("REVIEW_MAX_ATTEMPTS", "5"))
+REVIEW_POLL_INTERVAL = float(os.getenv("REVIEW_POLL_INTERVAL", "2"))
+# A running job whose worker hasn't renewed its lease for this long is retried
+REVIEW_JOB_LEASE = float(os.getenv("REVIEW_JOB_LEASE", "60"))
+
+logger = logging.getLogger("students.reviews")
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def request_hash(student_ids, target_status):
+    payload = json.dumps({"ids": sorted(student_ids), "status": target_status.value})
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ReviewQueue:
+    def __init__(self, batch_size=REVIEW_BATCH_SIZE, max_attempts=REVIEW_MAX_ATTEMPTS,
+                 poll_interval=REVIEW_POLL_INTERVAL, lease=REVIEW_JOB_LEASE):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.counters = dict.fromkeys(("jobs_done", "jobs_failed", "retries", "students_changed"), 0)
+
+    async def enqueue(self, student_ids, target_status, idempotency_key=None):
+        # Returns (job, created). Repeating a request with the same
+        # idempotency key returns the original job instead of a new one.
+        student_ids = sorted(set(student_ids))
+        digest = request_hash(student_ids, target_status)
+        if idempotency_key is not None:
+            existing = await ReviewJob.get_or_none(idempotency_key=idempotency_key)
+            if existing is not None:
+                return self._replay(existing, digest), False
+        try:
+            job = await ReviewJob.create(
+                idempotency_key=idempotency_key, request_hash=digest, target_status=target_status,
+                student_ids=student_ids, available_at=_now(),
+            )
+        except IntegrityError:
+            # Lost a race with the same key
+            existing = await ReviewJob.get(idempotency_key=idempotency_key)
+            return self._replay(existing, digest), False
+        self._wakeup.set()
+        return job, True
+
+    def _replay(self, job, digest):
+        if job.request_hash != digest:
+            raise IdempotencyConflict()
+        return job
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("could not claim a review job", exc_info=True)
+                job = None
+            if job is not None:
+                try:
+                    await self._process(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # e.g. the database went away mid-job; the lease hands
+                    # the job back once it runs out
+                    logger.warning("review job %s was interrupted", job.id, exc_info=True)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self):
+        # Several workers (processes) may poll the same table; a job belongs
+        # to whoever's conditional UPDATE matched it
+        now = _now()
+        ready = Q(status=JobStatus.QUEUED, available_at__lte=now) | Q(status=JobStatus.RUNNING, locked_until__lt=now)
+        candidates = await ReviewJob.filter(ready).order_by("id").limit(5)
+        for job in candidates:
+            # Candidates may come from a lagging replica; the UPDATE only
+            # matches if the row is still exactly as read
+            unchanged = Q(id=job.id, status=job.status, attempts=job.attempts)
+            if job.locked_until is None:
+                unchanged &= Q(locked_until__isnull=True)
+            else:
+                unchanged &= Q(locked_until=job.locked_until)
+            claimed = await ReviewJob.filter(unchanged).update(
+                status=JobStatus.RUNNING, attempts=job.attempts + 1,
+                locked_until=now + timedelta(seconds=self.lease),
+            )
+            if claimed:
+                job.status, job.attempts = JobStatus.RUNNING, job.attempts + 1
+                return job
+        return None
+
+    async def _process(self, job):
+        try:
+            # Resumes after the ids a previous attempt already handled
+            for start in range(job.processed, len(job.student_ids), self.batch_size):
+                changed = await self._apply_batch(job.student_ids[start:start + self.batch_size], job.target_status)
+                job.processed = min(start + self.batch_size, len(job.student_ids))
+                job.changed += len(changed)
+                await ReviewJob.filter(id=job.id).update(
+                    processed=job.processed, changed=job.changed,
+                    locked_until=_now() + timedelta(seconds=self.lease),
+                )
+                await self._emit(changed, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            await self._fail(job, exc)
+            return
+        await ReviewJob.filter(id=job.id).update(
+            status=JobStatus.DONE, finished_at=_now(), locked_until=None, error=None)
+        self.counters["jobs_done"] += 1
+
+    async def _apply_batch(self, ids, target_status):
+        # One locking SELECT to learn which rows will change (for the events),
+        # one UPDATE ... WHERE id IN (...) to change them. Both run on the
+        # primary's transaction; a replica could still show the old status.
+        async with in_transaction(PRIMARY) as conn:
+            rows = await (Student.filter(id__in=ids).exclude(registration_status=target_status)
+                          .select_for_update().only("id").using_db(conn))
+            changed = [row.id for row in rows]
+            if changed:
+                await Student.filter(id__in=changed).using_db(conn).update(registration_status=target_status)
+        self.counters["students_changed"] += len(changed)
+        return changed
+
+    async def _emit(self, changed, job):
+        if not changed:
+            return
+        # QuerySet.update() fires no model signals, so the cache is told here
+        await student_cache.invalidate_many(changed)
+        await status_events.publish([
+            {"student_id": student_id, "registration_status": job.target_status.value, "job_id": job.id}
+            for student_id in changed
+        ])
+
+    async def _fail(self, job, exc):
+        logger.warning("review job %s attempt %s failed: %s", job.id, job.attempts, exc)
+        if job.attempts >= self.max_attempts:
+            self.counters["jobs_failed"] += 1
+            await ReviewJob.filter(id=job.id).update(
+                status=JobStatus.FAILED, error=str(exc)[:2000], finished_at=_now(), locked_until=None)
+            return
+        self.counters["retries"] += 1
+        await ReviewJob.filter(id=job.id).update(
+            status=JobStatus.QUEUED, error=str(exc)[:2000], locked_until=None,
+            available_at=_now() + timedelta(seconds=min(60, 2 ** job.attempts)),
+        )
+
+    async def stats(self):
+        queued = await ReviewJob.filter(status=JobStatus.QUEUED).count()
+        running = await ReviewJob.filter(status=JobStatus.RUNNING).count()
+        oldest = await ReviewJob.filter(status=JobStatus.QUEUED).order_by("id").limit(1).values_list("created_at", flat=True)
+        return {
+            "queue_depth": queued + running,
+            "queued": queued,
+            "running": running,
+            "oldest_queued_age_s": round((_now() - oldest[0]).total_seconds(), 1) if oldest else None,
+            **self.counters,
+        }
+
+
+review_queue = ReviewQueue()
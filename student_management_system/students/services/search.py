@@ -0,0 +1,86 @@
+from tortoise.expressions import Q
+
+from db.indexes import ensure_index
+from db.models.documents import Document
+from db.models.students import Student
+
+# MySQL FULLTEXT indexes backing the search; created at startup when missing
+FULLTEXT_INDEXES = {
+    "students": ("ft_students_search", ("name", "department", "registration_no")),
+    "documents": ("ft_documents_title", ("title",)),
+}
+# An exact registration number or department match outranks any relevance score
+EXACT_MATCH_BOOST = 10.0
+MAX_SEARCH_TERMS = 8
+
+SEARCH_SQL = """
+SELECT id, SUM(score) AS score FROM (
+    SELECT id, MATCH(name, department, registration_no) AGAINST (%s) AS score
+    FROM students WHERE MATCH(name, department, registration_no) AGAINST (%s)
+    UNION ALL
+    SELECT student_id, MATCH(title) AGAINST (%s)
+    FROM documents WHERE MATCH(title) AGAINST (%s)
+    UNION ALL
+    SELECT id, %s FROM students WHERE registration_no = %s OR department = %s
+) AS hits
+GROUP BY id
+ORDER BY score DESC, id
+LIMIT %s OFFSET %s
+"""
+
+
+def _is_mysql():
+    return Student._meta.db.capabilities.dialect == "mysql"
+
+
+async def ensure_search_indexes():
+    # FULLTEXT is MySQL-only, so the indexes are added here rather than in the
+    # models' Meta; that keeps generate_schemas working on SQLite
+    for table, (name, columns) in FULLTEXT_INDEXES.items():
+        await ensure_index(Student._meta.db, table, columns, name=name, kind="FULLTEXT")
+
+
+async def search_students(q, fields, limit, offset=0):
+    # Returns up to `limit` student rows (as dicts with a "score"), best match
+    # first, plus whether more results follow
+    if _is_mysql():
+        ranked = await _ranked_fulltext(q, limit + 1, offset)
+    else:
+        ranked = await _ranked_scan(q, limit + 1, offset)
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+    rows = {row["id"]: row for row in await Student.filter(id__in=[i for i, _ in ranked]).values(*fields)}
+    results = []
+    for student_id, score in ranked:
+        if student_id in rows:  # deleted in between
+            results.append({**rows[student_id], "score": round(float(score), 4)})
+    return results, has_more
+
+
+async def _ranked_fulltext(q, limit, offset):
+    # Raw SQL bypasses the ORM's router, so ask it which connection to read from
+    _, rows = await Student._choose_db().execute_query(
+        SEARCH_SQL, [q, q, q, q, EXACT_MATCH_BOOST, q, q, limit, offset])
+    return [(row["id"], row["score"]) for row in rows]
+
+
+async def _ranked_scan(q, limit, offset):
+    # Fallback for databases without FULLTEXT (SQLite in development): LIKE
+    # matching scored by how many search terms each student or document hits
+    terms = [term.lower() for term in q.split()[:MAX_SEARCH_TERMS]]
+    if not terms:
+        return []
+    scores = {}
+    student_match = Q(*[Q(name__icontains=t) | Q(department__icontains=t) | Q(registration_no__icontains=t)
+                        for t in terms], join_type="OR")
+    for row in await Student.filter(student_match).values("id", "name", "department", "registration_no"):
+        text = " ".join(value or "" for value in (row["name"], row["department"], row["registration_no"])).lower()
+        score = sum(term in text for term in terms)
+        if q in (row["registration_no"], row["department"]):
+            score += EXACT_MATCH_BOOST
+        scores[row["id"]] = score
+    document_match = Q(*[Q(title__icontains=t) for t in terms], join_type="OR")
+    for student_id, title in await Document.filter(document_match).values_list("student_id", "title"):
+        scores[student_id] = scores.get(student_id, 0) + sum(term in title.lower() for term in terms)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[offset:offset + limit]
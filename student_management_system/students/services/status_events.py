@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+
+from shared import serialization
+
+STATUS_CHANNEL = "student_status_changes"
+EVENTS_MAX_BACKLOG = int(os.getenv("STATUS_EVENTS_MAX_BACKLOG", "100"))
+
+logger = logging.getLogger("students.events")
+
+
+class StatusEvents:
+    # Fans registration status changes out to the SSE clients of every
+    # worker: through Redis pub/sub when the service has Redis, otherwise only
+    # to this process's clients.
+
+    def __init__(self, max_backlog=EVENTS_MAX_BACKLOG):
+        self.max_backlog = max_backlog
+        self.redis = None
+        self._subscribers = set()
+        self._listener = None
+        self.dropped = 0
+
+    async def start(self, redis_client=None):
+        self.redis = redis_client
+        if self.redis is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for queue in self._subscribers:
+            self._close(queue)
+
+    @staticmethod
+    def _close(queue):
+        # The None sentinel ends the client's stream; a full queue gives up
+        # its oldest batch to make room for it
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.max_backlog)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    async def publish(self, events):
+        if not events:
+            return
+        if self.redis is not None:
+            try:
+                await self.redis.publish(STATUS_CHANNEL, serialization.dumps(events))
+                return
+            except Exception:
+                logger.warning("could not publish status events, delivering locally only", exc_info=True)
+        self._deliver(events)
+
+    def _deliver(self, events):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                # Too slow to keep up: disconnect it rather than buffer forever
+                self.dropped += 1
+                self._subscribers.discard(queue)
+                self._close(queue)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(STATUS_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._deliver(serialization.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("status event feed lost, reconnecting", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self):
+        return {"subscribers": len(self._subscribers), "dropped": self.dropped}
+
+
+status_events = StatusEvents()
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from tortoise.signals import post_delete, post_save
+
+from db.models.students import Student
+from db.routing import READ_YOUR_WRITES, primary_connection
+from services.metrics import LatencyHistogram
+from shared import serialization
+
+STUDENT_CACHE_SIZE = int(os.getenv("STUDENT_CACHE_SIZE", "10000"))
+STUDENT_CACHE_TTL = float(os.getenv("STUDENT_CACHE_TTL", "60"))
+STUDENT_CACHE_NEGATIVE_TTL = float(os.getenv("STUDENT_CACHE_NEGATIVE_TTL", "5"))
+# Optional shared second tier, e.g. redis://redis:6379/0
+STUDENT_CACHE_REDIS_URL = os.getenv("STUDENT_CACHE_REDIS_URL")
+INVALIDATION_CHANNEL = "student_cache_invalidate"
+
+logger = logging.getLogger("students.cache")
+
+MISSING = object()  # cached "no such student"
+
+
+class StudentCache:
+    # Read-through cache for single students: in-process LRU first, then
+    # (optionally) Redis, then the database. Misses for the same id that
+    # happen at the same time share one database query.
+
+    def __init__(self, loader, max_size=STUDENT_CACHE_SIZE, ttl=STUDENT_CACHE_TTL,
+                 negative_ttl=STUDENT_CACHE_NEGATIVE_TTL):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.redis = None
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # Recently written ids are loaded from the primary, so a lagging
+        # replica can't put the old row back into the cache
+        self._written = OrderedDict()
+        # Bumped by invalidations so a load that read the old row doesn't
+        # cache it afterwards; only ids with a load in flight are tracked
+        self._generations = {}
+        self._epoch = 0
+        self._subscriber = None
+        self.counters = dict.fromkeys(
+            ("local_hits", "redis_hits", "negative_hits", "misses", "coalesced", "invalidations", "evictions"), 0)
+        self.latency = {source: LatencyHistogram() for source in ("local", "redis", "database")}
+
+    async def start(self):
+        if not STUDENT_CACHE_REDIS_URL:
+            return
+        import redis.asyncio as redis
+        self.redis = redis.from_url(STUDENT_CACHE_REDIS_URL)
+        self._subscriber = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            try:
+                await self._subscriber
+            except asyncio.CancelledError:
+                pass
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def _key(self, student_id):
+        return f"student:{student_id}"
+
+    def _local_get(self, student_id):
+        entry = self._entries.get(student_id)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[student_id]
+            return None
+        self._entries.move_to_end(student_id)
+        return entry
+
+    def _local_put(self, student_id, value):
+        ttl = self.negative_ttl if value is MISSING else self.ttl
+        self._entries[student_id] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(student_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def get(self, student_id):
+        # Returns the student as a dict, or None if it doesn't exist
+        started = time.perf_counter()
+        entry = self._local_get(student_id)
+        if entry is not None:
+            value = entry[1]
+            self.counters["negative_hits" if value is MISSING else "local_hits"] += 1
+            self.latency["local"].observe((time.perf_counter() - started) * 1000)
+            return None if value is MISSING else value
+        while student_id in self._inflight:
+            self.counters["coalesced"] += 1
+            pending = self._inflight[student_id]
+            try:
+                value = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only the leader was cancelled (its client went away): the
+                # first follower to wake up loads the student instead
+                if pending.cancelled():
+                    continue
+                raise
+            return None if value is MISSING else value
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[student_id] = future
+        try:
+            value = await self._load(student_id, started)
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # don't warn when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[student_id]
+            self._generations.pop(student_id, None)
+        return None if value is MISSING else value
+
+    def _generation(self, student_id):
+        return self._epoch, self._generations.get(student_id, 0)
+
+    async def _load(self, student_id, started):
+        generation = self._generation(student_id)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._key(student_id))
+            except Exception:
+                logger.warning("redis student cache unavailable", exc_info=True)
+                raw = None
+            if raw is not None:
+                value = serialization.loads(raw)
+                if generation == self._generation(student_id):
+                    self._local_put(student_id, value)
+                self.counters["redis_hits"] += 1
+                self.latency["redis"].observe((time.perf_counter() - started) * 1000)
+                return value
+        self.counters["misses"] += 1
+        value = await self.loader(student_id, self._recently_written(student_id))
+        value = MISSING if value is None else value
+        if generation != self._generation(student_id):
+            # Invalidated while we were reading; the caller still gets the
+            # value, but the next lookup reads the row again
+            self.latency["database"].observe((time.perf_counter() - started) * 1000)
+            return value
+        self._local_put(student_id, value)
+        if self.redis is not None and value is not MISSING:
+            try:
+                await self.redis.set(self._key(student_id), serialization.dumps(value), ex=int(self.ttl))
+            except Exception:
+                logger.warning("redis student cache unavailable", exc_info=True)
+        self.latency["database"].observe((time.perf_counter() - started) * 1000)
+        return value
+
+    def _forget(self, student_id):
+        self._entries.pop(student_id, None)
+        if student_id in self._inflight:
+            self._generations[student_id] = self._generations.get(student_id, 0) + 1
+        now = time.monotonic()
+        self._written[student_id] = now
+        self._written.move_to_end(student_id)
+        while self._written and next(iter(self._written.values())) < now - READ_YOUR_WRITES:
+            self._written.popitem(last=False)
+
+    def _recently_written(self, student_id):
+        written = self._written.get(student_id)
+        return written is not None and written >= time.monotonic() - READ_YOUR_WRITES
+
+    async def invalidate(self, student_id):
+        await self.invalidate_many([student_id])
+
+    async def invalidate_many(self, student_ids):
+        self.counters["invalidations"] += len(student_ids)
+        for student_id in student_ids:
+            self._forget(student_id)
+        if self.redis is not None and student_ids:
+            try:
+                await self.redis.delete(*(self._key(student_id) for student_id in student_ids))
+                await self.redis.publish(INVALIDATION_CHANNEL, ",".join(map(str, student_ids)))
+            except Exception:
+                logger.warning("could not invalidate %d students in redis", len(student_ids), exc_info=True)
+
+    def _drop_missing(self):
+        self._epoch += 1
+        for student_id in [k for k, (_, v) in self._entries.items() if v is MISSING]:
+            del self._entries[student_id]
+
+    async def forget_missing(self):
+        # bulk_create fires no per-row signals, so after a bulk insert every
+        # cached "not found" is dropped instead
+        self._drop_missing()
+        if self.redis is not None:
+            try:
+                await self.redis.publish(INVALIDATION_CHANNEL, "missing")
+            except Exception:
+                logger.warning("could not publish student cache invalidation", exc_info=True)
+
+    async def _listen(self):
+        # Other workers' writes: drop our local copy of that student
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["data"] == b"missing":
+                        self._drop_missing()
+                    else:
+                        for student_id in message["data"].split(b","):
+                            self._forget(int(student_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("student cache invalidation feed lost, clearing local cache", exc_info=True)
+                self._epoch += 1
+                self._entries.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self):
+        # Coalesced lookups waited on someone else's query, so they count as hits
+        lookups = (self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["negative_hits"]
+                   + self.counters["coalesced"] + self.counters["misses"])
+        hits = lookups - self.counters["misses"]
+        return {
+            "size": len(self._entries),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            **self.counters,
+            "latency": {source: histogram.as_dict() for source, histogram in self.latency.items()},
+        }
+
+
+async def load_student(student_id, from_primary=False):
+    query = Student.filter(id=student_id)
+    if from_primary:
+        query = query.using_db(primary_connection())
+    rows = await query.limit(1).values(
+        "id", "name", "email", "department", "registration_no", "registration_status", "phone")
+    if not rows:
+        return None
+    row = rows[0]
+    row["registration_status"] = row["registration_status"].value
+    return row
+
+
+student_cache = StudentCache(load_student)
+
+
+@post_save(Student)
+async def _student_saved(sender, instance, created, using_db, update_fields):
+    await student_cache.invalidate(instance.id)
+
+
+@post_delete(Student)
+async def _student_deleted(sender, instance, using_db):
+    await student_cache.invalidate(instance.id)
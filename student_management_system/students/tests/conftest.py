@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The service imports its modules top-level and the shared package from the repo root
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(HERE, "..", "..", "..")]
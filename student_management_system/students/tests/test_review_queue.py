@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+from tortoise import Tortoise, connections
+from tortoise.utils import get_schema_sql
+
+from db.models.students import RegistrationStatus, Student
+from db.routing import PRIMARY, REPLICA, replica_monitor
+from services.review_queue import ReviewQueue
+
+
+def run_with_replica(tmp_path, test):
+    # Two SQLite files standing in for a primary and a replica that hasn't
+    # caught up, with reads routed to the replica
+    async def main():
+        await Tortoise.init(config={
+            "connections": {
+                PRIMARY: f"sqlite://{os.path.join(tmp_path, 'primary.db')}",
+                REPLICA: f"sqlite://{os.path.join(tmp_path, 'replica.db')}",
+            },
+            "apps": {"models": {"models": ["db.models.students"], "default_connection": PRIMARY}},
+            "routers": ["db.routing.ReplicaRouter"],
+        })
+        schema = get_schema_sql(connections.get(PRIMARY), safe=False)
+        for name in (PRIMARY, REPLICA):
+            await connections.get(name).execute_script(schema)
+        replica_monitor.available = True
+        try:
+            await test()
+        finally:
+            replica_monitor.available = False
+            await Tortoise.close_connections()
+
+    asyncio.run(main())
+
+
+def test_apply_batch_reads_from_primary(tmp_path):
+    async def test():
+        for n, status in enumerate((RegistrationStatus.PENDING, RegistrationStatus.PENDING), start=1):
+            await Student.create(id=n, name=f"Student {n}", email=f"s{n}@example.com", password_hash="x",
+                                 department="CSE", registration_status=status)
+        # The replica still shows student 1 as already complete
+        replica = connections.get(REPLICA)
+        for n, status in ((1, RegistrationStatus.COMPLETE), (2, RegistrationStatus.PENDING)):
+            await Student.create(id=n, name=f"Student {n}", email=f"s{n}@example.com", password_hash="x",
+                                 department="CSE", registration_status=status, using_db=replica)
+
+        changed = await ReviewQueue()._apply_batch([1, 2], RegistrationStatus.COMPLETE)
+
+        assert sorted(changed) == [1, 2]
+        statuses = await Student.filter(id__in=[1, 2]).using_db(connections.get(PRIMARY)).values_list(
+            "registration_status", flat=True)
+        assert set(statuses) == {RegistrationStatus.COMPLETE}
+
+    run_with_replica(tmp_path, test)